@@ -1,53 +1,319 @@
-from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Sequence
+import asyncio
 import json
-import random
+import re
 from config import settings
+from llm_cache import response_cache, cache_key
+from metrics import span
+from rate_limit import TokenBucket
+import llm_providers
+import mock_scenarios
+import similarity_index
+from llm_providers import LLMUnavailable
+from tokens import count_tokens, token_usage, truncate_to_tokens, usage_or_count
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+TEMPERATURE = 0.8
+SYSTEM_PROMPT = "You are an expert decision analyst and futurist who helps people visualize potential outcomes of their decisions. Generate realistic, data-driven scenarios with specific metrics and timelines."
+# Format instructions are identical for every request, so they live in the
+# system message (a stable prefix providers can cache) rather than the prompt
+SCENARIO_INSTRUCTIONS = """For each scenario provide a descriptive title, a probability (0-1), a description, a timeline of 3-5 milestones, quantitative outcomes (financial impact per year, satisfaction 1-10, time investment), 2-3 risks with severity low/medium/high, and recommendations.
+Format each scenario as JSON like:
+{"title":"Scenario title","probability":0.75,"description":"What happens","timeline":[{"period":"Month 3","event":"First milestone","impact":"positive"},{"period":"Year 1","event":"Major milestone","impact":"neutral"}],"outcomes":{"financial":{"year_1":50000,"year_3":75000,"year_5":100000},"satisfaction":7.5,"time_investment_hours":500},"risks":[{"factor":"Risk description","severity":"medium","mitigation":"How to mitigate"}],"recommendations":"Key recommendations"}"""
+JSON_MODE_INSTRUCTION = 'Respond with a single JSON object of the form {"scenarios": [...]} and nothing else.'
 
+# Caps in-flight provider calls per event loop (one loop per process under uvicorn)
+_provider_semaphores: Dict[int, asyncio.Semaphore] = {}
 
-def generate_scenarios(
+
+def get_provider_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _provider_semaphores.get(id(loop))
+    if semaphore is None:
+        _provider_semaphores.clear()
+        semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        _provider_semaphores[id(loop)] = semaphore
+    return semaphore
+
+
+# Token-per-minute budget per event loop, like the semaphore above
+_token_budgets: Dict[int, TokenBucket] = {}
+
+
+# Completion size per scenario (pretty-printed ~10-year scenarios run ~650 tokens): fixed fields,
+# plus timeline milestones and yearly financials that grow with the horizon
+TOKENS_PER_SCENARIO = 400
+TOKENS_PER_SCENARIO_YEAR = 40
+COMPLETION_OVERHEAD_TOKENS = 50
+
+
+def completion_budget(num_scenarios: int, time_horizon_years: int) -> int:
+    """max_tokens sized to the requested output, capped at LLM_MAX_TOKENS"""
+    needed = COMPLETION_OVERHEAD_TOKENS + num_scenarios * (
+        TOKENS_PER_SCENARIO + TOKENS_PER_SCENARIO_YEAR * time_horizon_years
+    )
+    return min(needed, settings.LLM_MAX_TOKENS)
+
+
+def prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(message["content"]) for message in messages)
+
+
+def record_usage(provider: str, messages: List[Dict[str, str]], text: str, completion=None) -> None:
+    """Add one request's token usage to the metrics, preferring provider-reported counts"""
+    token_usage.record(
+        provider,
+        usage_or_count(completion.prompt_tokens if completion else 0, "\n".join(m["content"] for m in messages)),
+        usage_or_count(completion.completion_tokens if completion else 0, text),
+    )
+
+
+async def reserve_tokens(messages: List[Dict[str, str]], options: Dict[str, Any]) -> None:
+    """Wait for room in the LLM_TOKENS_PER_MINUTE budget; no-op when it's disabled"""
+    if settings.LLM_TOKENS_PER_MINUTE <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    budget = _token_budgets.get(id(loop))
+    if budget is None:
+        _token_budgets.clear()
+        budget = TokenBucket(settings.LLM_TOKENS_PER_MINUTE)
+        _token_budgets[id(loop)] = budget
+    await budget.acquire(prompt_tokens(messages) + options["max_tokens"])
+
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    system_prompt = SYSTEM_PROMPT + "\n\n" + SCENARIO_INSTRUCTIONS
+    if settings.LLM_JSON_MODE:
+        system_prompt += " " + JSON_MODE_INSTRUCTION
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def completion_options(num_scenarios: int, time_horizon_years: int) -> Dict[str, Any]:
+    """Model parameters for one provider call; each provider maps them to its API"""
+    return {
+        "temperature": TEMPERATURE,
+        "max_tokens": completion_budget(num_scenarios, time_horizon_years),
+        "json_mode": settings.LLM_JSON_MODE,
+    }
+
+
+def fallback_scenarios(
+    message: str,
+    decision_title: str,
+    category: str,
+    num_scenarios: int,
+    time_horizon_years: int
+) -> List[Dict[str, Any]]:
+    """Mock scenarios if LLM_MOCK_FALLBACK allows them, otherwise LLMUnavailable"""
+    print(message)
+    if not settings.LLM_MOCK_FALLBACK:
+        raise LLMUnavailable(message)
+    return generate_mock_scenarios(decision_title, category, num_scenarios, time_horizon_years)
+
+
+async def generate_scenarios_async(
     decision_title: str,
     decision_description: str,
     category: str,
     context: Dict[str, Any],
     num_scenarios: int = 3,
-    time_horizon_years: int = 5
+    time_horizon_years: int = 5,
+    timeout: Optional[float] = None,
+    force_refresh: bool = False,
+    user_id: Optional[str] = None,
+    decision_ids: Sequence[str] = ()
 ) -> List[Dict[str, Any]]:
     """
-    Generate multiple future scenarios for a decision using AI
+    Generate multiple future scenarios for a decision using AI. Requests are
+    routed across providers (see llm_providers), bounded by
+    LLM_MAX_CONCURRENCY, and abandoned after `timeout` seconds
+    (LLM_TIMEOUT_SECONDS by default) including retries. Cached completions
+    (memory, then Redis), then scenarios of a near-duplicate of one of
+    decision_ids (owned by user_id) are reused unless force_refresh is set.
     """
     
-    if not client:
-        # Fallback to mock data if no API key
+    router = llm_providers.router
+    if router is None:
         return generate_mock_scenarios(decision_title, category, num_scenarios, time_horizon_years)
     
     try:
-        # Create a detailed prompt for scenario generation
-        prompt = create_scenario_prompt(
-            decision_title, decision_description, category, context, num_scenarios, time_horizon_years
-        )
+        with span("llm.prompt"):
+            prompt = create_scenario_prompt(
+                decision_title, decision_description, category, context, num_scenarios, time_horizon_years
+            )
         
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert decision analyst and futurist who helps people visualize potential outcomes of their decisions. Generate realistic, data-driven scenarios with specific metrics and timelines."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=2000
-        )
+        key = cache_key(prompt, router.model_key, TEMPERATURE)
+        if not force_refresh:
+            with span("llm.cache_lookup"):
+                cached_text = await response_cache.get(key)
+                scenarios = extract_scenarios(cached_text) if cached_text else []
+            if scenarios:
+                return scenarios
+            if decision_ids:
+                with span("llm.similar_lookup"):
+                    similar = similarity_index.similar_decisions(
+                        user_id, category, decision_title, decision_description, context, exclude=decision_ids
+                    )
+                if similar:
+                    scenarios = await asyncio.to_thread(
+                        similarity_index.reuse_scenarios, similar, decision_title, num_scenarios, time_horizon_years
+                    )
+                    if scenarios:
+                        return scenarios
         
-        # Parse the AI response
-        scenarios_text = response.choices[0].message.content
-        scenarios = parse_scenarios_from_text(scenarios_text, time_horizon_years)
+        messages = build_messages(prompt)
+        options = completion_options(num_scenarios, time_horizon_years)
+        # Waiting on the token budget or a provider slot, as opposed to the call itself
+        with span("llm.queue"):
+            await reserve_tokens(messages, options)
+            semaphore = get_provider_semaphore()
+            await semaphore.acquire()
+        try:
+            with span("llm.completion"):
+                completion = await asyncio.wait_for(
+                    router.complete(messages, options),
+                    timeout=timeout or settings.LLM_TIMEOUT_SECONDS
+                )
+        finally:
+            semaphore.release()
+        record_usage(completion.provider, messages, completion.text, completion)
         
+        # Unparseable output raises, and is handled like any other failure below;
+        # only completions that actually parsed are cached
+        with span("llm.parse"):
+            scenarios = parse_scenarios_from_text(completion.text)
+        await response_cache.set(key, completion.text)
         return scenarios
     
+    except asyncio.TimeoutError:
+        return fallback_scenarios(
+            f"Scenario generation timed out after {timeout or settings.LLM_TIMEOUT_SECONDS}s",
+            decision_title, category, num_scenarios, time_horizon_years
+        )
     except Exception as e:
-        print(f"Error generating scenarios with AI: {e}")
-        return generate_mock_scenarios(decision_title, category, num_scenarios, time_horizon_years)
+        return fallback_scenarios(
+            f"Error generating scenarios with AI: {e}", decision_title, category, num_scenarios, time_horizon_years
+        )
+
+
+async def stream_scenarios(
+    decision_title: str,
+    decision_description: str,
+    category: str,
+    context: Dict[str, Any],
+    num_scenarios: int = 3,
+    time_horizon_years: int = 5,
+    timeout: Optional[float] = None,
+    force_refresh: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield scenarios one at a time as their JSON objects close in the provider's
+    token stream. If the stream fails before any scenario, the failure is
+    handled like generate_scenarios_async (see fallback_scenarios).
+    """
+    
+    router = llm_providers.router
+    if router is None:
+        for scenario in generate_mock_scenarios(decision_title, category, num_scenarios, time_horizon_years):
+            yield scenario
+        return
+    
+    prompt = create_scenario_prompt(
+        decision_title, decision_description, category, context, num_scenarios, time_horizon_years
+    )
+    key = cache_key(prompt, router.model_key, TEMPERATURE)
+    
+    if not force_refresh:
+        cached_text = await response_cache.get(key)
+        scenarios = extract_scenarios(cached_text) if cached_text else []
+        if scenarios:
+            for scenario in scenarios:
+                yield scenario
+            return
+    
+    parser = ScenarioStreamParser()
+    chunks = []
+    error = None
+    messages = build_messages(prompt)
+    options = completion_options(num_scenarios, time_horizon_years)
+    stream_info: Dict[str, str] = {}
+    try:
+        await reserve_tokens(messages, options)
+        async with get_provider_semaphore():
+            async with asyncio.timeout(timeout or settings.LLM_TIMEOUT_SECONDS):
+                async for delta in router.stream(messages, options, stream_info):
+                    chunks.append(delta)
+                    for scenario in parser.feed(delta):
+                        yield scenario
+    except Exception as e:
+        if parser.count:
+            raise
+        error = e
+    
+    if chunks:
+        # Streams carry no usage block, so completion tokens are counted locally
+        record_usage(stream_info.get("provider", "unknown"), messages, "".join(chunks))
+    
+    if parser.count:
+        await response_cache.set(key, "".join(chunks))
+        return
+    
+    if error is None:
+        try:
+            scenarios = parse_scenarios_from_text("".join(chunks))
+        except ValueError as e:
+            error = e
+    if error is not None:
+        scenarios = fallback_scenarios(
+            f"Error streaming scenarios with AI: {error}", decision_title, category, num_scenarios, time_horizon_years
+        )
+    for scenario in scenarios:
+        yield scenario
+
+
+def _context_value(value: Any) -> str:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def render_context(context: Optional[Dict[str, Any]], budget: int) -> str:
+    """
+    `- key: value` lines within `budget` tokens. Values that fit an even share
+    of the budget are kept whole and what they leave over is split between
+    the larger ones, which are cut to their share.
+    """
+    if not context:
+        return "No additional context provided"
+    
+    lines = [(f"- {key}: ", _context_value(value), value) for key, value in context.items()]
+    costs = [count_tokens(prefix + text) for prefix, text, _ in lines]
+    if sum(costs) <= budget:
+        return "\n".join(prefix + text for prefix, text, _ in lines)
+    
+    allowance = {}
+    remaining = budget
+    pending = sorted(range(len(lines)), key=costs.__getitem__)
+    while pending:
+        share = remaining // len(pending)
+        if costs[pending[0]] > share:
+            allowance.update((i, share) for i in pending)
+            break
+        i = pending.pop(0)
+        allowance[i] = costs[i]
+        remaining -= costs[i]
+    
+    rendered = []
+    for i, (prefix, text, value) in enumerate(lines):
+        if allowance[i] >= costs[i]:
+            rendered.append(prefix + text)
+            continue
+        # Lists and objects say how much was left out
+        marker = f"… ({len(value)} items)" if isinstance(value, (list, dict)) else "…"
+        rendered.append(prefix + truncate_to_tokens(text, max(allowance[i] - count_tokens(prefix), 1), marker))
+    return "\n".join(rendered)
 
 
 def create_scenario_prompt(
@@ -58,80 +324,163 @@ def create_scenario_prompt(
     num_scenarios: int,
     time_horizon: int
 ) -> str:
-    """Create a detailed prompt for scenario generation"""
+    """
+    Decision-specific prompt; the output format is in the system message.
+    Description and context are cut to LLM_DESCRIPTION_TOKEN_BUDGET and
+    LLM_CONTEXT_TOKEN_BUDGET tokens.
+    """
     
-    context_str = "\n".join([f"- {k}: {v}" for k, v in context.items()]) if context else "No additional context provided"
+    description = truncate_to_tokens(" ".join((description or "").split()), settings.LLM_DESCRIPTION_TOKEN_BUDGET)
+    context_str = render_context(context, settings.LLM_CONTEXT_TOKEN_BUDGET)
     
-    prompt = f"""
-I need help analyzing a {category} decision. Please generate {num_scenarios} distinct future scenarios over a {time_horizon}-year timeline.
+    prompt = f"""I need help analyzing a {category} decision. Please generate {num_scenarios} distinct future scenarios over a {time_horizon}-year timeline, ranging from optimistic to conservative to challenging.
 
 Decision: {title}
 Description: {description}
 
 Context:
-{context_str}
-
-For each scenario, provide:
-1. A descriptive title
-2. Probability estimate (0-100%)
-3. Detailed description of what happens
-4. Timeline with key milestones (at least 3-5 milestones)
-5. Quantitative outcomes (financial impact, satisfaction score 1-10, time investment)
-6. Risk factors (at least 2-3 risks with severity: low/medium/high)
-7. Recommendations
-
-Format each scenario as JSON with this structure:
-{{
-  "title": "Scenario title",
-  "probability": 0.75,
-  "description": "What happens in this scenario",
-  "timeline": [
-    {{"period": "Month 3", "event": "First milestone", "impact": "positive"}},
-    {{"period": "Year 1", "event": "Major milestone", "impact": "neutral"}}
-  ],
-  "outcomes": {{
-    "financial": {{"year_1": 50000, "year_3": 75000, "year_5": 100000}},
-    "satisfaction": 7.5,
-    "time_investment_hours": 500
-  }},
-  "risks": [
-    {{"factor": "Risk description", "severity": "medium", "mitigation": "How to mitigate"}}
-  ],
-  "recommendations": "Key recommendations for this path"
-}}
-
-Generate {num_scenarios} diverse scenarios ranging from optimistic to conservative to challenging.
-"""
+{context_str}"""
     return prompt
 
 
-def parse_scenarios_from_text(text: str, time_horizon: int) -> List[Dict[str, Any]]:
-    """Parse scenarios from AI-generated text"""
+# A whole string literal (escapes included) or a single brace. Strings are
+# consumed whole so braces inside them never count; the unrolled pattern can't
+# backtrack, so the scan stays linear.
+_JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]', re.DOTALL)
+_decoder = json.JSONDecoder()
+
+
+def _object_end(text: str, start: int) -> Optional[int]:
+    """Index just past the object opening at text[start], or None if it never closes"""
     
-    scenarios = []
+    depth = 0
+    for match in _JSON_TOKEN.finditer(text, start):
+        token = match.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+def _collect_scenarios(obj: Any, scenarios: List[Dict[str, Any]], limit: int) -> None:
+    """Append obj as a scenario, unwrapping JSON-mode {"scenarios": [...]} envelopes"""
     
-    # Try to extract JSON objects from the text
-    try:
-        # Look for JSON array or multiple JSON objects
-        import re
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        matches = re.findall(json_pattern, text, re.DOTALL)
+    if not isinstance(obj, dict) or not obj:
+        return
+    candidates = obj["scenarios"] if isinstance(obj.get("scenarios"), list) else [obj]
+    for scenario in candidates:
+        if len(scenarios) >= limit:
+            return
+        if isinstance(scenario, dict) and scenario:
+            scenario["rank"] = len(scenarios) + 1
+            scenarios.append(scenario)
+
+
+class ScenarioStreamParser:
+    """
+    Incremental extractor for top-level JSON objects in a token stream.
+    Tracks brace depth outside of string literals so each object is emitted as
+    soon as its closing brace arrives, however deeply it nests.
+    """
+    
+    def __init__(self, limit: int = 5):
+        self.limit = limit
+        self.scenarios: List[Dict[str, Any]] = []
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+    
+    @property
+    def count(self) -> int:
+        return len(self.scenarios)
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume the next piece of text and return any scenarios it completed"""
         
-        for i, match in enumerate(matches[:5]):  # Limit to 5 scenarios
-            try:
-                scenario = json.loads(match)
-                # Add rank
-                scenario['rank'] = i + 1
-                scenarios.append(scenario)
-            except json.JSONDecodeError:
+        before = self.count
+        start = 0 if self._depth else None
+        
+        for i, ch in enumerate(chunk):
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    start = i
                 continue
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    self._emit("".join(self._parts))
+                    self._parts = []
+                    start = None
+        
+        if self._depth and start is not None:
+            self._parts.append(chunk[start:])
+        
+        return self.scenarios[before:]
     
-    except Exception as e:
-        print(f"Error parsing scenarios: {e}")
+    def _emit(self, text: str) -> None:
+        try:
+            obj = json.loads(text)
+        except (json.JSONDecodeError, RecursionError):
+            return
+        _collect_scenarios(obj, self.scenarios, self.limit)
+
+
+def extract_scenarios(text: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Extract scenario objects from AI-generated text; empty list if none parse.
+    Each top-level object is decoded in place with raw_decode, which also tells
+    us where it ends. A malformed object is skipped whole using the string-aware
+    brace scanner, so every character is visited a bounded number of times.
+    """
+    
+    scenarios: List[Dict[str, Any]] = []
+    if not text:
+        return scenarios
+    
+    pos = 0
+    while len(scenarios) < limit:
+        # Prose between objects may hold stray quotes, so only tokenize inside one
+        start = text.find("{", pos)
+        if start < 0:
+            break
+        try:
+            obj, pos = _decoder.raw_decode(text, start)
+        except (json.JSONDecodeError, RecursionError):
+            end = _object_end(text, start)
+            if end is None:
+                break
+            pos = end
+            continue
+        _collect_scenarios(obj, scenarios, limit)
+    
+    return scenarios
+
+
+def parse_scenarios_from_text(text: str) -> List[Dict[str, Any]]:
+    """Parse scenarios from AI-generated text; ValueError if it holds none"""
+    
+    scenarios = extract_scenarios(text)
     
-    # If parsing failed, return mock scenarios
     if not scenarios:
-        return generate_mock_scenarios("Decision", "general", 3, time_horizon)
+        raise ValueError("Could not parse any scenarios from the provider's response")
     
     return scenarios
 
@@ -140,118 +489,9 @@ def generate_mock_scenarios(
     decision_title: str,
     category: str,
     num_scenarios: int,
-    time_horizon: int
+    time_horizon: int,
+    seed: Optional[int] = None
 ) -> List[Dict[str, Any]]:
-    """Generate mock scenarios when AI is not available"""
-    
-    scenarios = []
-    
-    scenario_templates = [
-        {
-            "title": f"Optimistic Path: {decision_title}",
-            "probability": 0.65,
-            "description": "Everything goes according to plan with minimal setbacks. You achieve your goals ahead of schedule.",
-            "base_financial": 1.2,
-            "satisfaction": 8.5,
-            "risk_level": "low"
-        },
-        {
-            "title": f"Balanced Approach: {decision_title}",
-            "probability": 0.75,
-            "description": "A realistic middle-ground scenario with expected challenges and steady progress.",
-            "base_financial": 1.0,
-            "satisfaction": 7.0,
-            "risk_level": "medium"
-        },
-        {
-            "title": f"Conservative Path: {decision_title}",
-            "probability": 0.55,
-            "description": "A cautious approach with slower progress but lower risk. Takes longer but more stable.",
-            "base_financial": 0.8,
-            "satisfaction": 6.5,
-            "risk_level": "low"
-        },
-        {
-            "title": f"Aggressive Strategy: {decision_title}",
-            "probability": 0.45,
-            "description": "High-risk, high-reward approach. Potential for significant gains but also setbacks.",
-            "base_financial": 1.5,
-            "satisfaction": 7.5,
-            "risk_level": "high"
-        },
-        {
-            "title": f"Gradual Transition: {decision_title}",
-            "probability": 0.70,
-            "description": "Step-by-step approach minimizing disruption. Slower but more manageable.",
-            "base_financial": 0.9,
-            "satisfaction": 7.8,
-            "risk_level": "low"
-        }
-    ]
-    
-    for i in range(min(num_scenarios, len(scenario_templates))):
-        template = scenario_templates[i]
-        
-        # Generate timeline
-        timeline = []
-        for year in range(1, time_horizon + 1):
-            if year == 1:
-                timeline.append({
-                    "period": f"Year {year}",
-                    "event": f"Initial implementation and learning phase",
-                    "impact": "neutral"
-                })
-            elif year == time_horizon:
-                timeline.append({
-                    "period": f"Year {year}",
-                    "event": f"Full realization of outcomes",
-                    "impact": "positive"
-                })
-            else:
-                timeline.append({
-                    "period": f"Year {year}",
-                    "event": f"Continued progress and optimization",
-                    "impact": "positive"
-                })
-        
-        # Generate financial outcomes
-        base_amount = 60000 if category == "career" else 50000
-        financial_outcomes = {}
-        for year in [1, 3, 5]:
-            if year <= time_horizon:
-                multiplier = template["base_financial"] * (1 + (year - 1) * 0.15)
-                financial_outcomes[f"year_{year}"] = int(base_amount * multiplier)
-        
-        # Generate risks
-        risks = [
-            {
-                "factor": "Market conditions may change",
-                "severity": template["risk_level"],
-                "mitigation": "Stay informed and be ready to adapt"
-            },
-            {
-                "factor": "Unexpected challenges may arise",
-                "severity": "medium",
-                "mitigation": "Build contingency plans and maintain flexibility"
-            }
-        ]
-        
-        scenario = {
-            "title": template["title"],
-            "probability": template["probability"],
-            "description": template["description"],
-            "timeline": timeline,
-            "outcomes": {
-                "financial": financial_outcomes,
-                "satisfaction": template["satisfaction"],
-                "time_investment_hours": random.randint(300, 1000)
-            },
-            "risks": risks,
-            "recommendations": f"This path is suitable if you prioritize {'stability' if template['risk_level'] == 'low' else 'growth'}. Consider your risk tolerance and timeline.",
-            "rank": i + 1
-        }
-        
-        scenarios.append(scenario)
+    """Generate mock scenarios when AI is not available; deterministic per seed and decision"""
     
-    return scenarios
-
+    return mock_scenarios.generate(decision_title, category, num_scenarios, time_horizon, seed)
@@ -1,24 +1,82 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from config import settings
 from database import get_db
+from ttl_cache import LRUCache
+from metrics import span
 import models
+import password_hashing
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 
+@dataclass(frozen=True)
+class Principal:
+    """Immutable snapshot of the authenticated user, safe to cache across requests"""
+    id: str
+    email: str
+    is_active: bool = True
+    full_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=bool(user.is_active) if user.is_active is not None else True,
+            full_name=user.full_name,
+            created_at=user.created_at
+        )
+
+
+# Principals keyed on the token's `sub`. Short TTL bounds staleness across
+# processes; updates in this process invalidate immediately (see below).
+principal_cache = LRUCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(user_id: str) -> None:
+    principal_cache.delete(user_id)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+def _hashing_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    valid, _ = verify_and_update_password(plain_password, hashed_password)
+    return valid
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verify in the hashing pool; also returns a new hash if the stored one is outdated"""
+    try:
+        return password_hashing.verify_and_update(plain_password, hashed_password)
+    except password_hashing.HashingOverloaded:
+        raise _hashing_overloaded()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    try:
+        return password_hashing.hash_password(password)
+    except password_hashing.HashingOverloaded:
+        raise _hashing_overloaded()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -32,31 +90,76 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def token_claims(user: models.User) -> dict:
+    """Claims for a new access token; with AUTH_EMBED_CLAIMS, enough to skip the DB on reads"""
+    claims = {"sub": user.id}
+    if settings.AUTH_EMBED_CLAIMS:
+        claims.update({"email": user.email, "is_active": user.is_active is not False})
+    return claims
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def load_principal(db: Session, user_id: str) -> Principal:
+    """Cached user lookup; only a miss touches the database"""
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+    if not principal.is_active:
+        raise _credentials_exception()
+    return principal
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    with span("auth.decode_token"):
+        payload = decode_token(token)
+    with span("auth.load_principal"):
+        return load_principal(db, payload["sub"])
+
+
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    For read endpoints: trusts claims embedded at login (AUTH_EMBED_CLAIMS) and
+    skips the database entirely, falling back to the cached lookup otherwise.
+    Embedded claims stay valid until the token expires.
+    """
+    payload = decode_token(token)
+    if "email" in payload and "is_active" in payload:
+        if not payload["is_active"]:
+            raise _credentials_exception()
+        return Principal(id=payload["sub"], email=payload["email"], is_active=True)
+    return load_principal(db, payload["sub"])
 
 
 def authenticate_user(db: Session, email: str, password: str):
     user = db.query(models.User).filter(models.User.email == email).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # Cost or scheme changed since this hash was made; upgrade it transparently
+        user.hashed_password = new_hash
+        db.commit()
     return user
-
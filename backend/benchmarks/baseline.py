@@ -0,0 +1,84 @@
+"""
+Stored benchmark baselines and regression checks.
+
+Results are flat {metric: value} dicts. Metrics ending in "_per_s" are
+higher-is-better; everything else (latencies, per-call times) is
+lower-is-better. Baselines live in benchmarks/baselines/ and are refreshed
+with --save-baseline on the reference machine.
+"""
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save(name: str, metrics: Dict[str, float], config: Dict) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(name)
+    with open(path, "w") as f:
+        json.dump({
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "machine": f"{platform.system()} {platform.machine()} {os.cpu_count()} cpus, Python {platform.python_version()}",
+            "config": config,
+            "metrics": metrics,
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def load(name: str) -> Optional[Dict]:
+    path = baseline_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(metrics: Dict[str, float], baseline: Dict, tolerance: float) -> List[str]:
+    """Lines for metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    regressions = []
+    for name, reference in sorted(baseline["metrics"].items()):
+        value = metrics.get(name)
+        if value is None or not reference:
+            continue
+        change = (value - reference) / reference
+        worse = -change if name.endswith("_per_s") else change
+        if worse > tolerance:
+            regressions.append(f"{name}: {value:.4g} vs baseline {reference:.4g} ({change:+.0%})")
+    return regressions
+
+
+def report(name: str, metrics: Dict[str, float], config: Dict, args) -> int:
+    """Shared --save-baseline / --compare handling; returns the process exit code"""
+    if args.save_baseline:
+        print(f"\nSaved baseline to {save(name, metrics, config)}")
+        return 0
+    if not args.compare:
+        return 0
+    stored = load(name)
+    if stored is None:
+        print(f"\nNo baseline at {baseline_path(name)}; record one with --save-baseline")
+        return 0
+    if stored.get("config") != config:
+        print(f"\nNote: baseline was recorded with {stored.get('config')}")
+    regressions = compare(metrics, stored, args.tolerance)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%} of the baseline ({stored.get('recorded_at')}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nWithin {args.tolerance:.0%} of the baseline ({stored.get('recorded_at')})")
+    return 0
+
+
+def add_arguments(parser, tolerance: float) -> None:
+    parser.add_argument("--compare", action="store_true", help="compare against the stored baseline; exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=tolerance, help="allowed fractional slowdown")
@@ -0,0 +1,70 @@
+"""
+Microbenchmark per-request authentication overhead.
+
+Compares, against a file-backed SQLite database:
+  - uncached: JWT decode + user SELECT on every request (the old behaviour)
+  - cached:   JWT decode + principal cache hit
+  - claims:   JWT decode with embedded claims, no database access
+
+Usage (from backend/):
+    python benchmarks/bench_auth.py [--requests 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_path}")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import auth  # noqa: E402
+import models  # noqa: E402
+from config import settings  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+
+
+def run(label, requests, dependency, token):
+    start = time.perf_counter()
+    for _ in range(requests):
+        db = SessionLocal()
+        try:
+            dependency(token=token, db=db)
+        finally:
+            db.close()
+    per_request = (time.perf_counter() - start) / requests
+    print(f"{label:<10} {per_request * 1e6:9.1f} us/request")
+    return per_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = models.User(email="bench@example.com", hashed_password="x", full_name="Bench")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    plain_token = auth.create_access_token({"sub": user.id})
+    settings.AUTH_EMBED_CLAIMS = True
+    claims_token = auth.create_access_token(auth.token_claims(user))
+    db.close()
+
+    max_entries = auth.principal_cache.max_entries
+    auth.principal_cache.max_entries = 0
+    uncached = run("uncached", args.requests, auth.get_current_user, plain_token)
+    auth.principal_cache.max_entries = max_entries
+    cached = run("cached", args.requests, auth.get_current_user, plain_token)
+    claims = run("claims", args.requests, auth.get_current_principal, claims_token)
+
+    print(f"\ncache speedup {uncached / cached:.1f}x, embedded claims speedup {uncached / claims:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
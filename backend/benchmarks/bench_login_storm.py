@@ -0,0 +1,126 @@
+"""
+Login storm: p99 latency of unrelated endpoints while logins hammer bcrypt.
+
+Starts the API under uvicorn on a temporary SQLite database, measures GET /
+latency at rest, then again while --clients threads log in back to back.
+Run once per hashing mode to compare, e.g.:
+
+    python benchmarks/bench_login_storm.py --hash-pool inline
+    python benchmarks/bench_login_storm.py --hash-pool process
+
+Requires httpx (installed with FastAPI's test extras).
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, hash_pool: str, rounds: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'storm.db')}",
+        SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+        OPENAI_API_KEY="",
+        HASH_POOL=hash_pool,
+        BCRYPT_ROUNDS=str(rounds),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Server did not start")
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else float("nan")
+
+
+def probe(base_url: str, seconds: float):
+    latencies = []
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            start = time.perf_counter()
+            client.get("/")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:<14} n={len(latencies):<5} p50={percentile(latencies, 50) * 1e3:8.1f} ms"
+          f"  p95={percentile(latencies, 95) * 1e3:8.1f} ms  p99={percentile(latencies, 99) * 1e3:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hash-pool", default="process", choices=["process", "thread", "inline"])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port, args.hash_pool, args.rounds)
+    try:
+        credentials = {"username": "storm@example.com", "password": "storm-password"}
+        httpx.post(f"{base_url}/api/v1/auth/register", timeout=30,
+                   json={"email": credentials["username"], "password": credentials["password"]})
+
+        report("idle GET /", probe(base_url, min(args.seconds, 3.0)))
+
+        stop = threading.Event()
+        counts = {"ok": 0, "throttled": 0, "error": 0}
+        lock = threading.Lock()
+
+        def storm():
+            with httpx.Client(base_url=base_url, timeout=60) as client:
+                while not stop.is_set():
+                    response = client.post("/api/v1/auth/login", data=credentials)
+                    key = "ok" if response.status_code == 200 else "throttled" if response.status_code == 429 else "error"
+                    with lock:
+                        counts[key] += 1
+
+        threads = [threading.Thread(target=storm, daemon=True) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        report("storm GET /", probe(base_url, args.seconds))
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+
+        print(f"logins ({args.hash_pool}, {args.clients} clients): {counts['ok']} ok, "
+              f"{counts['throttled']} throttled (429), {counts['error']} errors")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Microbenchmarks for the per-request hot spots: scenario parsing, prompt
+building, mock generation, JWT encode/decode, response serialization
+(pydantic, and the fast_json path the decisions router uses) and comparing
+300 stored scenarios.
+
+Reports the median time per call over several timed runs.
+
+Usage (from backend/):
+    python benchmarks/bench_micro.py [--repeat 7] [--compare] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import ai_service  # noqa: E402
+import auth  # noqa: E402
+import baseline  # noqa: E402
+import comparison  # noqa: E402
+import models  # noqa: E402
+import schemas  # noqa: E402
+from routers import decisions_router  # noqa: E402
+
+
+def per_call_us(fn, repeat: int, min_seconds: float = 0.2) -> float:
+    """Median microseconds per call; each run loops long enough to be timed reliably"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_seconds / 4:
+            break
+        number *= 2
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    runs.sort()
+    return runs[len(runs) // 2] * 1e6
+
+
+def decision_with_scenarios():
+    """Transient ORM rows shaped like a simulated decision, as get_decision returns them"""
+    now = datetime.utcnow()
+    decision = models.Decision(
+        id=str(uuid.uuid4()), user_id=str(uuid.uuid4()), title="Switch to a startup", description="Offer in hand",
+        category="career", context={"salary": 120000, "city": "Berlin"}, status="completed",
+        created_at=now, updated_at=now
+    )
+    scenarios = [
+        models.Scenario(
+            id=str(uuid.uuid4()), decision_id=decision.id, title=data["title"], description=data["description"],
+            probability=data["probability"], timeline_data=data["timeline"], outcomes=data["outcomes"],
+            risks=data["risks"], recommendations=data["recommendations"], rank=data["rank"], created_at=now
+        )
+        for data in ai_service.generate_mock_scenarios(decision.title, "career", 5, 10, seed=1)
+    ]
+    return decision, scenarios
+
+
+def stored_scenarios(decisions: int = 60):
+    """Transient scenario rows from many simulated decisions, as the compare endpoint loads them"""
+    return [
+        models.Scenario(id=str(uuid.uuid4()), title=data["title"], probability=data["probability"],
+                        outcomes=data["outcomes"], risks=data["risks"])
+        for seed in range(decisions)
+        for data in ai_service.generate_mock_scenarios("Benchmark", "career", 5, 10, seed=seed)
+    ]
+
+
+def cases():
+    completion = json.dumps(
+        {"scenarios": ai_service.generate_mock_scenarios("Benchmark", "career", 5, 10, seed=1)}, indent=2
+    )
+    context = {f"field_{i}": f"value {i}" for i in range(20)}
+    context["notes"] = "Long free-form notes about the decision. " * 200
+    token = auth.create_access_token({"sub": str(uuid.uuid4())})
+    decision, scenarios = decision_with_scenarios()
+    compared = stored_scenarios()
+
+    return {
+        "parse_scenarios_from_text": lambda: ai_service.parse_scenarios_from_text(completion),
+        "create_scenario_prompt": lambda: ai_service.create_scenario_prompt(
+            "Switch to a startup", "Offer in hand", "career", context, 5, 10
+        ),
+        "generate_mock_scenarios": lambda: ai_service.generate_mock_scenarios("Benchmark", "career", 5, 10),
+        "jwt_encode": lambda: auth.create_access_token({"sub": "user-id"}),
+        "jwt_decode": lambda: auth.decode_token(token),
+        "serialize_decision_with_scenarios": lambda: schemas.DecisionWithScenariosResponse(
+            decision=decision, scenarios=scenarios
+        ).model_dump_json(),
+        "encode_decision_with_scenarios": lambda: decisions_router.decision_with_scenarios(decision, scenarios).body,
+        "compare_300_scenarios": lambda: comparison.compare(compared),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    baseline.add_arguments(parser, tolerance=0.3)
+    args = parser.parse_args()
+
+    # Warm up lazy state (token encoding, skeleton caches) outside the timings
+    for fn in cases().values():
+        fn()
+
+    metrics = {}
+    for name, fn in cases().items():
+        metrics[f"{name}_us"] = round(per_call_us(fn, args.repeat), 2)
+        print(f"{name:36s} {metrics[f'{name}_us']:>10.2f} us")
+
+    sys.exit(baseline.report("micro", metrics, {"repeat": args.repeat}, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark the mock scenario engine and check that it is deterministic.
+
+Usage (from backend/):
+    python benchmarks/bench_mock.py [--scenarios 5] [--years 10] [--calls 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import ai_service  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=5)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    first = ai_service.generate_mock_scenarios("Benchmark", "career", args.scenarios, args.years, args.seed)
+    again = ai_service.generate_mock_scenarios("Benchmark", "career", args.scenarios, args.years, args.seed)
+    other = ai_service.generate_mock_scenarios("Benchmark", "career", args.scenarios, args.years, args.seed + 1)
+
+    start = time.perf_counter()
+    for i in range(args.calls):
+        ai_service.generate_mock_scenarios(f"Decision {i % 100}", "career", args.scenarios, args.years, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.scenarios} scenarios x {args.years} years, {args.calls} calls")
+    print(f"{elapsed / args.calls * 1e6:.1f} us per call")
+    print(f"same seed identical: {first == again}   different seed differs: {first != other}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Benchmark the vectorized Monte Carlo engine.
+
+Usage (from backend/):
+    python benchmarks/bench_monte_carlo.py [--paths 100000] [--years 10] [--scenarios 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import ai_service  # noqa: E402
+import monte_carlo  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--scenarios", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scenarios = ai_service.generate_mock_scenarios("Benchmark", "career", args.scenarios, args.years)
+
+    timings = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        monte_carlo.simulate_outcomes(scenarios, args.years, args.paths, seed=i)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(f"{args.scenarios} scenarios x {args.paths} paths x {args.years} years")
+    print(f"best {timings[0] * 1e3:.1f} ms   median {timings[len(timings) // 2] * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
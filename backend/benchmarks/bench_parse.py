@@ -0,0 +1,119 @@
+"""
+Benchmark scenario extraction from LLM output.
+
+Compares the legacy two-level regex with ai_service.extract_scenarios over a
+corpus of well-formed and malformed completions, reporting parse time and how
+many of the expected scenarios each approach recovers.
+
+Usage (from backend/):
+    python benchmarks/bench_parse.py [--repeat 50]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import ai_service  # noqa: E402
+
+LEGACY_PATTERN = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
+
+
+def legacy_extract(text):
+    scenarios = []
+    for match in re.findall(LEGACY_PATTERN, text, re.DOTALL)[:5]:
+        try:
+            scenarios.append(json.loads(match))
+        except json.JSONDecodeError:
+            continue
+    return scenarios
+
+
+def make_scenario(rng, i, horizon=5):
+    """A scenario shaped like the prompt's schema: 3+ levels of nesting"""
+    return {
+        "title": f"Scenario {i}: {rng.choice(['Optimistic', 'Balanced', 'Challenging'])} {{path}}",
+        "probability": round(rng.random(), 2),
+        "description": "What happens \"next\" in this path, with {braces} in prose.",
+        "timeline": [
+            {"period": f"Year {y}", "event": f"Milestone {y}", "impact": rng.choice(["positive", "neutral"])}
+            for y in range(1, horizon + 1)
+        ],
+        "outcomes": {
+            "financial": {f"year_{y}": rng.randint(30000, 150000) for y in (1, 3, 5)},
+            "satisfaction": round(rng.uniform(4, 9), 1),
+            "time_investment_hours": rng.randint(200, 1200)
+        },
+        "risks": [
+            {"factor": f"Risk {r}", "severity": rng.choice(["low", "medium", "high"]), "mitigation": "Plan ahead"}
+            for r in range(3)
+        ],
+        "recommendations": "Key recommendations for this path"
+    }
+
+
+def build_corpus(seed=7):
+    """(name, text, expected scenario count) cases"""
+    rng = random.Random(seed)
+    corpus = []
+    for n in (3, 5):
+        scenarios = [make_scenario(rng, i) for i in range(n)]
+        objects = [json.dumps(s, indent=2) for s in scenarios]
+        corpus.append((f"prose+objects x{n}", "Here are the scenarios:\n\n" + "\n\n".join(objects) + "\n\nGood luck!", n))
+        corpus.append((f"fenced array x{n}", "```json\n[\n" + ",\n".join(objects) + "\n]\n```", n))
+        corpus.append((f"json mode x{n}", json.dumps({"scenarios": scenarios}), n))
+        corpus.append((f"truncated x{n}", "[" + ",".join(objects)[:-200], n - 1))
+        broken = list(objects)
+        broken[0] = broken[0].replace('"probability"', '"probability",', 1)
+        corpus.append((f"one malformed x{n}", "\n".join(broken), n - 1))
+        corpus.append((f"stray quote x{n}", 'I\'m 5\'10" and "unsure\n' + "\n".join(objects), n))
+    junk = "".join(rng.choice("{}[]\":,ab ") for _ in range(200_000))
+    corpus.append(("200KB brace noise", junk, 0))
+    corpus.append(("deep unbalanced", "{" * 20_000 + '"x": 1', 0))
+    return corpus
+
+
+def bench(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(text)
+    # Only count whole scenarios, not nested timeline/risk objects picked up on their own
+    found = sum(1 for obj in result if isinstance(obj, dict) and "title" in obj and "outcomes" in obj)
+    return (time.perf_counter() - start) / repeat, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    totals = {"legacy": [0.0, 0], "extract": [0.0, 0]}
+    expected_total = 0
+
+    print(f"{'case':<22}{'size':>9}{'exp':>5}{'legacy ms':>12}{'got':>5}{'extract ms':>12}{'got':>5}")
+    for name, text, expected in corpus:
+        legacy_time, legacy_found = bench(legacy_extract, text, args.repeat)
+        new_time, new_found = bench(ai_service.extract_scenarios, text, args.repeat)
+        expected_total += expected
+        totals["legacy"][0] += legacy_time
+        totals["legacy"][1] += min(legacy_found, expected)
+        totals["extract"][0] += new_time
+        totals["extract"][1] += min(new_found, expected)
+        print(f"{name:<22}{len(text):>9}{expected:>5}{legacy_time * 1e3:>12.3f}{legacy_found:>5}"
+              f"{new_time * 1e3:>12.3f}{new_found:>5}")
+
+    print()
+    for label, (elapsed, recovered) in totals.items():
+        rate = recovered / expected_total if expected_total else 0.0
+        print(f"{label:<8} total {elapsed * 1e3:9.3f} ms   recovered {recovered}/{expected_total} ({rate:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark GET /api/v1/decisions/{id} response serialization.
+
+Compares, for a decision with 5 scenarios over a 10-year horizon:
+  - fastapi:   the path FastAPI takes for a model returned through
+               response_model (build the model from the rows, dump it,
+               validate + serialize against response_model, json.dumps)
+  - fast:      fast_json: the schema's columns off the rows, encoded once
+  - fast-core: the same with pydantic-core's encoder instead of orjson
+
+and checks that all three produce the same JSON.
+
+Usage (from backend/):
+    python benchmarks/bench_serialize.py [--repeat 7]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import fast_json  # noqa: E402
+import schemas  # noqa: E402
+from bench_micro import decision_with_scenarios, per_call_us  # noqa: E402
+from routers import decisions_router  # noqa: E402
+
+
+def fastapi_default(field, decision, scenarios) -> bytes:
+    """
+    What fastapi.routing.serialize_response did with get_decision's return value
+    before, minus the threadpool hop it takes to validate for sync endpoints
+    """
+    model = schemas.DecisionWithScenariosResponse(decision=decision, scenarios=scenarios)
+    content = model.model_dump(by_alias=True)  # _prepare_response_content
+    value, errors = field.validate(content, {}, loc=("response",))
+    assert not errors, errors
+    return JSONResponse(field.serialize(value, mode="json", by_alias=True)).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    route = next(r for r in decisions_router.router.routes if r.name == "get_decision")
+    decision, scenarios = decision_with_scenarios()
+    orjson = fast_json.orjson
+
+    def fast_core():
+        fast_json.orjson = None
+        try:
+            return decisions_router.decision_with_scenarios(decision, scenarios).body
+        finally:
+            fast_json.orjson = orjson
+
+    cases = {
+        "fastapi": lambda: fastapi_default(route.response_field, decision, scenarios),
+        "fast": lambda: decisions_router.decision_with_scenarios(decision, scenarios).body,
+        "fast-core": fast_core,
+    }
+
+    expected = json.loads(cases["fastapi"]())
+    for name, fn in cases.items():
+        assert json.loads(fn()) == expected, f"{name} output differs from FastAPI's"
+
+    print(f"5 scenarios x 10-year horizon, {len(cases['fastapi']())} byte response"
+          f"{'' if orjson else ' (orjson not installed; fast uses pydantic-core)'}")
+    base = None
+    for name, fn in cases.items():
+        us = per_call_us(fn, args.repeat)
+        base = base or us
+        print(f"{name:10s} {us:9.1f} us   {base / us:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark the near-duplicate decision index (similarity_index) at scale.
+
+Bulk-loads --size synthetic decisions (the startup rebuild path) into one
+index with SIMILARITY_SCOPE=global: 5 categories, so each group holds a fifth of
+the index, the worst case for lookups. A tenth of the decisions are light
+rewordings of a few hundred popular ones (crowded LSH buckets), the rest are
+random. Then it times single lookups for reworded copies (should match) and
+fresh text (should not), and single adds (the create/update endpoint path).
+
+Usage (from backend/):
+    python benchmarks/bench_similarity.py [--size 1000000] [--queries 2000] [--compare] [--save-baseline]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["SIMILARITY_SCOPE"] = "global"
+
+import baseline  # noqa: E402
+import similarity_index  # noqa: E402
+
+CATEGORIES = ("career", "finance", "health", "business", "education")
+POPULAR = 500
+
+
+def vocabulary(rng: random.Random, size: int = 5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def reword(rng: random.Random, words, vocab):
+    """Swap one word for another, the kind of edit two people filing the same decision make"""
+    words = list(words)
+    words[rng.randrange(len(words))] = rng.choice(vocab)
+    return words
+
+
+def decision(decision_id: str, category: str, words):
+    return (decision_id, None, category, " ".join(words[:8]), " ".join(words[8:]), {})
+
+
+def synthetic_decisions(rng: random.Random, size: int, vocab, popular):
+    for i in range(size):
+        if i % 10 == 0:
+            category, words = popular[rng.randrange(len(popular))]
+            words = reword(rng, words, vocab)
+        else:
+            category, words = rng.choice(CATEGORIES), rng.sample(vocab, rng.randint(14, 30))
+        yield decision(f"d{i}", category, words)
+
+
+def percentiles_us(samples):
+    samples = sorted(samples)
+    return {
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+    }
+
+
+def timed(fn, calls):
+    samples = []
+    results = []
+    for args in calls:
+        start = time.perf_counter()
+        results.append(fn(*args))
+        samples.append(time.perf_counter() - start)
+    return samples, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    baseline.add_arguments(parser, tolerance=0.5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    popular = [(rng.choice(CATEGORIES), rng.sample(vocab, rng.randint(14, 30))) for _ in range(POPULAR)]
+    index = similarity_index.SimilarityIndex()
+
+    start = time.perf_counter()
+    index.add_many(synthetic_decisions(rng, args.size, vocab, popular))
+    load_seconds = time.perf_counter() - start
+    print(f"loaded {len(index)} decisions in {load_seconds:.1f}s")
+
+    def lookup(category, words):
+        return index.similar(None, category, " ".join(words[:8]), " ".join(words[8:]), {})
+
+    near = [(category, reword(rng, words, vocab)) for category, words in rng.choices(popular, k=args.queries)]
+    fresh = [(rng.choice(CATEGORIES), rng.sample(vocab, rng.randint(14, 30))) for _ in range(args.queries)]
+    near_samples, near_results = timed(lookup, near)
+    fresh_samples, fresh_results = timed(lookup, fresh)
+    add_samples, _ = timed(index.add, [
+        (f"new{i}", None, category, " ".join(words[:8]), " ".join(words[8:]), {})
+        for i, (category, words) in enumerate(fresh)
+    ])
+
+    metrics = {"load_us_per_decision": load_seconds / args.size * 1e6}
+    for name, samples in (("lookup_near", near_samples), ("lookup_fresh", fresh_samples), ("add", add_samples)):
+        for key, value in percentiles_us(samples).items():
+            metrics[f"{name}_{key}"] = value
+
+    for name, value in metrics.items():
+        print(f"{name:24s} {value:10.1f}")
+    # Recall and false positives; not baselined, which compares latencies
+    print(f"reworded copies matched {sum(map(bool, near_results)) / len(near_results):.1%}, "
+          f"fresh text matched {sum(map(bool, fresh_results)) / len(fresh_results):.1%}")
+    return baseline.report("similarity", metrics, {"size": args.size, "queries": args.queries}, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
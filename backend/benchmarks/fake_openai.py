@@ -0,0 +1,128 @@
+"""
+A fake OpenAI-compatible chat completions server for load tests.
+
+Answers POST /v1/chat/completions (plain and stream=true) with mock scenarios
+after a configurable latency, so the API can be loaded end to end without a
+real provider. Point the API at it with OPENAI_BASE_URL=http://host:port/v1.
+
+Usage (from backend/):
+    python benchmarks/fake_openai.py [--port 9100] [--latency 0.2] [--jitter 0.05]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+import mock_scenarios  # noqa: E402
+from tokens import count_tokens  # noqa: E402
+
+STREAM_CHUNK_CHARS = 48
+
+
+def create_app(latency: float = 0.2, jitter: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+
+    async def wait():
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+    def completion_text(messages) -> str:
+        prompt = messages[-1]["content"]
+        count = int(m.group(1)) if (m := re.search(r"(\d+) distinct", prompt)) else 3
+        horizon = int(m.group(1)) if (m := re.search(r"(\d+)-year", prompt)) else 5
+        title = m.group(1).strip() if (m := re.search(r"Decision: (.*)", prompt)) else "Decision"
+        return json.dumps({"scenarios": mock_scenarios.generate(title, "general", count, horizon)})
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        text = completion_text(body["messages"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await wait()
+            prompt_tokens = sum(count_tokens(m["content"]) for m in body["messages"])
+            completion_tokens = count_tokens(text)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                },
+            }
+
+        async def events():
+            # Latency is spent before the first token, like a real provider
+            await wait()
+            for offset in range(0, len(text), STREAM_CHUNK_CHARS):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": {"content": text[offset:offset + STREAM_CHUNK_CHARS]}}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeOpenAIServer:
+    """Runs the fake server under uvicorn in a background thread"""
+
+    def __init__(self, port: int, latency: float = 0.2, jitter: float = 0.0):
+        self.app = create_app(latency, jitter)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the response (or first token)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- seconds added to the latency")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.jitter), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
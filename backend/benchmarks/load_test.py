@@ -0,0 +1,193 @@
+"""
+In-process load test: register -> login -> create -> simulate -> get.
+
+Drives main.app through httpx's ASGI transport on a temporary SQLite database,
+with OpenAI calls going to benchmarks/fake_openai.py (started in a thread) so
+provider latency is controlled. Each virtual user registers and logs in once,
+then runs --iterations decision flows: create, simulate (202 + polling the
+job until it finishes), get. Reports throughput and p50/p95/p99 per endpoint.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--users 20] [--iterations 5] [--llm-latency 0.2]
+    python benchmarks/load_test.py --compare          # exit 1 on regression
+    python benchmarks/load_test.py --save-baseline    # refresh the stored baseline
+"""
+import argparse
+import asyncio
+import os
+import re
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+POLL_INTERVAL = 0.02
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure(args, base_url: str) -> None:
+    """Settings are read at import, so this runs before the app is imported"""
+    os.environ.update(
+        # Sync endpoints and their dependency teardown can run on different threadpool threads
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}?check_same_thread=false",
+        SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+        LLM_PROVIDERS="openai",
+        OPENAI_API_KEY="fake",
+        OPENAI_BASE_URL=base_url,
+        BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+        JOB_BACKEND="inprocess",
+    )
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Recorder:
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    def summary(self) -> Dict[str, float]:
+        metrics = {}
+        for name, samples in sorted(self.timings.items()):
+            ordered = sorted(samples)
+            key = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+            for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                metrics[f"{key}_{label}_ms"] = round(percentile(ordered, q) * 1000, 2)
+        return metrics
+
+
+async def run(args) -> Dict[str, float]:
+    import httpx
+    import main
+
+    recorder = Recorder()
+    await main.app.router.startup()
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+
+        async def call(name: str, method: str, url: str, **kwargs) -> httpx.Response:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            recorder.timings[name].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                recorder.errors[name] += 1
+                raise RuntimeError(f"{name} -> {response.status_code}: {response.text[:200]}")
+            return response
+
+        async def user_flow(user: int) -> int:
+            email = f"load-{user}-{uuid.uuid4().hex[:8]}@example.com"
+            await call("POST /auth/register", "POST", "/api/v1/auth/register",
+                       json={"email": email, "password": "LoadTest123!", "full_name": f"User {user}"})
+            login = await call("POST /auth/login", "POST", "/api/v1/auth/login",
+                               data={"username": email, "password": "LoadTest123!"})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            completed = 0
+            for iteration in range(args.iterations):
+                try:
+                    decision = await call("POST /decisions", "POST", "/api/v1/decisions", headers=headers, json={
+                        # Unique titles keep the LLM response cache out of the measurement
+                        "title": f"Decision {user}-{iteration}-{uuid.uuid4().hex[:6]}",
+                        "description": "Load test decision",
+                        "category": "career",
+                        "context": {"salary": 100000 + user, "city": "Berlin"},
+                    })
+                    decision_id = decision.json()["id"]
+
+                    started = time.perf_counter()
+                    job = await call("POST /decisions/{id}/simulate", "POST",
+                                     f"/api/v1/decisions/{decision_id}/simulate", headers=headers,
+                                     json={"decision_id": decision_id, "num_scenarios": 3, "num_paths": args.num_paths})
+                    job_id = job.json()["id"]
+                    while True:
+                        status = (await call("GET /jobs/{id}", "GET", f"/api/v1/jobs/{job_id}", headers=headers)).json()
+                        if status["status"] not in ("queued", "running"):
+                            break
+                        await asyncio.sleep(POLL_INTERVAL)
+                    recorder.timings["simulate end-to-end"].append(time.perf_counter() - started)
+                    if status["status"] != "completed":
+                        recorder.errors["simulate end-to-end"] += 1
+                        continue
+
+                    await call("GET /decisions/{id}", "GET", f"/api/v1/decisions/{decision_id}", headers=headers)
+                    completed += 1
+                except RuntimeError as e:
+                    print(f"  user {user}: {e}")
+            return completed
+
+        start = time.perf_counter()
+        flows = await asyncio.gather(*(user_flow(user) for user in range(args.users)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+    await main.app.router.shutdown()
+
+    completed = sum(result for result in flows if isinstance(result, int))
+    failed_users = [result for result in flows if isinstance(result, Exception)]
+    requests = sum(len(samples) for name, samples in recorder.timings.items() if name != "simulate end-to-end")
+
+    print(f"{args.users} users x {args.iterations} flows, LLM latency {args.llm_latency * 1000:.0f} ms, "
+          f"{elapsed:.2f} s wall")
+    print(f"\n{'endpoint':34s} {'count':>7s} {'errors':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, samples in sorted(recorder.timings.items()):
+        ordered = sorted(samples)
+        print(f"{name:34s} {len(samples):7d} {recorder.errors[name]:7d} "
+              f"{percentile(ordered, 0.5) * 1000:9.1f} {percentile(ordered, 0.95) * 1000:9.1f} "
+              f"{percentile(ordered, 0.99) * 1000:9.1f}")
+    print(f"\nthroughput: {requests / elapsed:.1f} requests/s, {completed / elapsed:.2f} flows/s "
+          f"({completed} completed, {sum(recorder.errors.values())} errors)")
+    for error in failed_users:
+        print(f"  user failed: {error}")
+
+    metrics = recorder.summary()
+    metrics["requests_per_s"] = round(requests / elapsed, 2)
+    metrics["flows_per_s"] = round(completed / elapsed, 3)
+    return metrics
+
+
+def main():
+    import baseline
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake provider latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--num-paths", type=int, default=10000, help="Monte Carlo paths per scenario")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="low by default so hashing doesn't dominate")
+    baseline.add_arguments(parser, tolerance=0.5)
+    args = parser.parse_args()
+
+    port = free_port()
+    configure(args, f"http://127.0.0.1:{port}/v1")
+    # Imported after configure(): the fake server shares the app's mock scenarios, and so its settings
+    from fake_openai import FakeOpenAIServer
+
+    fake = FakeOpenAIServer(port, args.llm_latency, args.llm_jitter).start()
+    try:
+        metrics = asyncio.run(run(args))
+    finally:
+        fake.stop()
+
+    config = {
+        "users": args.users, "iterations": args.iterations, "llm_latency": args.llm_latency,
+        "llm_jitter": args.llm_jitter, "num_paths": args.num_paths, "bcrypt_rounds": args.bcrypt_rounds,
+    }
+    sys.exit(baseline.report("load_test", metrics, config, args))
+
+
+if __name__ == "__main__":
+    main()
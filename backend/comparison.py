@@ -0,0 +1,157 @@
+"""
+Side-by-side comparison of stored scenarios.
+
+Scenarios from any number of decisions are compared against a baseline. Their
+JSON payloads are read once into flat arrays (yearly financials as sparse
+(scenario, year, value) triples, risk severities as (scenario, severity)
+pairs); everything after that is whole-array NumPy work over
+(scenarios, years):
+
+  - financial: outcomes.financial interpolated onto 1..years and held flat
+    past the first and last given year, as monte_carlo.expected_path does
+  - delta: financial minus the baseline's, year by year
+  - break-even year: the first year from which cumulative financials stay
+    non-negative, on their own and relative to the baseline
+  - risk-adjusted value: yearly financials, each scaled by the share of value
+    expected to survive the Monte Carlo risk hazards up to that year, summed
+    and weighted by probability
+  - dominance: the Pareto relation over ranking's criteria, so it agrees with
+    how scenarios are ranked
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import ranking
+from monte_carlo import RISK_HAZARD, RISK_LOSS
+
+MAX_YEARS = 50
+
+
+def _year(key: Any) -> int:
+    try:
+        return int(str(key).rsplit("_", 1)[-1])
+    except ValueError:
+        return 0
+
+
+def _amount(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _financial_points(scenarios: Sequence[Any]):
+    """Flat (scenario index, year, value) arrays of every usable year_N entry"""
+    points = [
+        (i, _year(key), _amount(value))
+        for i, scenario in enumerate(scenarios)
+        if isinstance(scenario.outcomes, dict) and isinstance(scenario.outcomes.get("financial"), dict)
+        for key, value in scenario.outcomes["financial"].items()
+    ]
+    rows, years, values = (np.array(column) for column in zip(*points)) if points else (np.array([]),) * 3
+    usable = (years >= 1) & (years <= MAX_YEARS) & ~np.isnan(values.astype(np.float64))
+    return rows[usable].astype(np.int64), years[usable].astype(np.int64), values[usable].astype(np.float64)
+
+
+def interpolate(rows: np.ndarray, years: np.ndarray, values: np.ndarray, count: int, horizon: int) -> np.ndarray:
+    """
+    (count, horizon) yearly values from sparse points, linear between given
+    years and flat outside them; NaN rows for scenarios without points
+    """
+    width = max(horizon, int(years.max(initial=0)))
+    known = np.full((count, width), np.nan)
+    known[rows, years - 1] = values
+    given = ~np.isnan(known)
+    columns = np.arange(width)
+
+    # Nearest given column at or before / at or after each column
+    before = np.maximum.accumulate(np.where(given, columns, -1), axis=1)
+    after = np.minimum.accumulate(np.where(given, columns, width)[:, ::-1], axis=1)[:, ::-1]
+    before = np.where(before < 0, after, before)
+    after = np.where(after >= width, before, after)
+    missing = after >= width
+
+    low = np.take_along_axis(known, np.clip(before, 0, width - 1), axis=1)
+    high = np.take_along_axis(known, np.clip(after, 0, width - 1), axis=1)
+    span = after - before
+    share = np.divide(columns - before, span, out=np.zeros(known.shape), where=span > 0)
+    result = low + (high - low) * share
+    result[missing] = np.nan
+    return result[:, :horizon]
+
+
+def _survival(scenarios: Sequence[Any], horizon: int) -> np.ndarray:
+    """(scenarios, horizon) expected share of value left after each year's risk hits"""
+    hits = [
+        (i, str(risk.get("severity", "medium")).lower())
+        for i, scenario in enumerate(scenarios)
+        for risk in (scenario.risks or []) if isinstance(risk, dict)
+    ]
+    # A risk strikes with its hazard each year and removes its loss share, so
+    # the expected yearly keep factor is 1 - hazard * loss
+    log_keep = np.log1p([
+        -RISK_HAZARD.get(severity, RISK_HAZARD["medium"]) * RISK_LOSS.get(severity, RISK_LOSS["medium"])
+        for _, severity in hits
+    ])
+    per_year = np.bincount(
+        np.array([i for i, _ in hits], dtype=np.int64), weights=log_keep, minlength=len(scenarios)
+    )
+    return np.exp(per_year[:, None] * np.arange(1, horizon + 1)[None, :])
+
+
+def break_even_years(cumulative: np.ndarray) -> np.ndarray:
+    """1-based first year from which cumulative values stay >= 0; 0 where they end negative or are unknown"""
+    horizon = cumulative.shape[1]
+    negative = cumulative < 0
+    last_negative = horizon - 1 - np.argmax(negative[:, ::-1], axis=1)
+    years = np.where(negative.any(axis=1), last_negative + 2, 1)
+    years[(years > horizon) | np.isnan(cumulative).all(axis=1)] = 0
+    return years
+
+
+def _nullable(values: np.ndarray, digits: int = 2) -> List[Any]:
+    """Rounded values as lists, NaN as None"""
+    result = np.round(values, digits).astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+
+def compare(scenarios: Sequence[Any], baseline: int = 0, years: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compare rows with .outcomes, .risks and .probability against
+    scenarios[baseline]. years defaults to the furthest year any of them
+    gives (at most MAX_YEARS). Per-scenario lists follow the input order;
+    dominance[i][j] is 1 when i dominates j, -1 when j dominates i, else 0.
+    """
+    count = len(scenarios)
+    rows, points, values = _financial_points(scenarios)
+    horizon = years or min(max(int(points.max(initial=1)), 1), MAX_YEARS)
+
+    financial = interpolate(rows, points, values, count, horizon)
+    delta = financial - financial[baseline]
+    features = np.array([
+        ranking.scenario_features(scenario.outcomes, scenario.risks, scenario.probability) for scenario in scenarios
+    ], dtype=np.float64).reshape(count, len(ranking.CRITERIA))
+    probability = features[:, ranking.CRITERIA.index("probability")]
+    risk_adjusted = (financial * _survival(scenarios, horizon)).sum(axis=1) * probability
+
+    dominates = ranking.dominance(features[None], np.ones((1, count), dtype=bool))[0]
+    break_even = break_even_years(np.cumsum(financial, axis=1))
+    break_even_vs_baseline = break_even_years(np.cumsum(delta, axis=1))
+
+    return {
+        "years": list(range(1, horizon + 1)),
+        "value": _nullable(features[:, ranking.CRITERIA.index("financial")]),
+        "satisfaction": _nullable(features[:, ranking.CRITERIA.index("satisfaction")]),
+        "risk": _nullable(0.0 - features[:, ranking.CRITERIA.index("risk")]),
+        "probability": _nullable(probability, 4),
+        "risk_adjusted_value": _nullable(risk_adjusted),
+        "break_even_year": [int(year) or None for year in break_even],
+        "break_even_vs_baseline": [int(year) or None for year in break_even_vs_baseline],
+        "pareto_front": (~dominates.any(axis=0)).tolist(),
+        "financial": _nullable(financial),
+        "delta": _nullable(delta),
+        "dominance": (dominates.astype(np.int8) - dominates.T.astype(np.int8)).tolist(),
+    }
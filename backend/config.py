@@ -11,15 +11,56 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: str = ""  # derived from DATABASE_URL when empty
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds; below typical idle-disconnect windows
+    DB_POOL_PRE_PING: bool = True
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_EMBED_CLAIMS: bool = False  # put email/is_active in tokens so reads skip the DB
+    BCRYPT_ROUNDS: int = 12
+    HASH_POOL: str = "process"  # process, thread, inline
+    HASH_WORKERS: int = 0  # 0 = one per CPU core
+    HASH_QUEUE_SIZE: int = 64  # waiting hashes beyond the workers before 429
     
     # AI Services
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
+    LLM_PROVIDERS: str = "openai"  # preference order: openai, anthropic, stub; keyless providers are skipped
+    OPENAI_MODEL: str = "gpt-4"
+    OPENAI_BASE_URL: str = ""  # OpenAI-compatible endpoint (proxy, Azure gateway, benchmarks/fake_openai.py)
+    ANTHROPIC_MODEL: str = "claude-3-5-sonnet-20241022"
+    LLM_HEDGE_ENABLED: bool = True  # start the next provider when one is slower than its p95
+    LLM_HEDGE_DELAY_SECONDS: float = 10.0  # hedge delay until a provider has a latency history
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_MOCK_FALLBACK: bool = False  # serve mock scenarios when every provider fails
+    LLM_STUB_LATENCY_SECONDS: float = 0.0
+    LLM_MOCK_SEED: int = 0  # mock scenarios are a pure function of this seed and the decision
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_TOKENS_PER_MINUTE: int = 0  # provider token budget per process; 0 disables
+    LLM_MAX_TOKENS: int = 4096  # cap on max_tokens, which is otherwise sized per request
+    LLM_CONTEXT_TOKEN_BUDGET: int = 800  # decision context is cut to fit
+    LLM_DESCRIPTION_TOKEN_BUDGET: int = 600
+    LLM_JSON_MODE: bool = False  # request structured JSON output (model must support it)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_REDIS: bool = False  # share completions across processes via REDIS_URL
+    SIMILARITY_ENABLED: bool = True  # reuse a near-duplicate decision's scenarios instead of calling the LLM
+    SIMILARITY_THRESHOLD: float = 0.7  # estimated Jaccard similarity of words and word pairs
+    SIMILARITY_SCOPE: str = "user"  # user, or global to reuse across users (scenarios can quote their text)
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
@@ -27,6 +68,25 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Background jobs
+    JOB_BACKEND: str = "inprocess"  # inprocess, redis
+    JOB_WORKERS: int = 64  # asyncio tasks; provider calls are capped by LLM_MAX_CONCURRENCY
+    JOB_TTL_SECONDS: int = 86400
+    SIMULATE_CLAIM_TTL_SECONDS: int = 900  # redis: a dead worker's hold on a decision expires after this
+    BATCH_MAX_DECISIONS: int = 500
+    BATCH_FLUSH_SIZE: int = 50  # decisions persisted per bulk write in batch jobs
+    SCENARIO_VERSIONS_KEPT: int = 20  # newest simulation runs kept per decision; 0 keeps all
+    COMPARE_MAX_SCENARIOS: int = 500
+    EXPORT_CHUNK_ROWS: int = 2000  # rows per database fetch, written chunk and Parquet row group
+    
+    # Observability
+    METRICS_ENABLED: bool = True  # latency histograms and GET /metrics
+    PROFILE_SLOW_REQUESTS_SECONDS: float = 0.0  # sample stacks and dump requests slower than this; 0 disables
+    PROFILE_INTERVAL_SECONDS: float = 0.005
+    PROFILE_WINDOW_SECONDS: float = 120.0  # samples kept; longer requests are only partly covered
+    PROFILE_DIR: str = "profiles"
+    PROFILE_MAX_FILES: int = 100
+    
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
@@ -1,14 +1,140 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from config import settings
+import metrics
+
+
+class PoolStats:
+    """Counters fed by the instrumented pool and pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
 
-engine = create_engine(settings.DATABASE_URL)
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool settings from config; in-memory SQLite keeps its single-connection default"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+    ):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+_options = engine_options(settings.DATABASE_URL)
+engine = create_engine(
+    settings.DATABASE_URL,
+    **({"poolclass": InstrumentedQueuePool, **_options} if _options else {})
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    pool_stats.connects += 1
+
+
+@event.listens_for(engine, "invalidate")
+def _count_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.invalidations += 1
+
+
+STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _record_statement_time(conn, cursor, statement, parameters, context, executemany):
+    kind = statement.lstrip()[:6].upper()
+    metrics.db_seconds.observe(
+        time.perf_counter() - context._metrics_started, kind if kind in STATEMENT_KINDS else "OTHER"
+    )
+
+
+def time_statements(target) -> None:
+    if settings.METRICS_ENABLED:
+        event.listen(target, "before_cursor_execute", _start_statement_timer)
+        event.listen(target, "after_cursor_execute", _record_statement_time)
+
+
+time_statements(engine)
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Current pool occupancy plus cumulative checkout/wait counters"""
+    pool = engine.pool
+    metrics: Dict[str, Any] = {
+        "pool_class": type(pool).__name__,
+        "connects": pool_stats.connects,
+        "invalidations": pool_stats.invalidations,
+    }
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    # Only an instrumented pool counts checkouts and waits; zeros from any other would mislead
+    if isinstance(pool, InstrumentedQueuePool):
+        metrics.update({
+            "checkouts": pool_stats.checkouts,
+            "timeouts": pool_stats.timeouts,
+            "wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+            "wait_seconds_max": round(pool_stats.wait_seconds_max, 6),
+        })
+    return metrics
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -16,3 +142,50 @@ def get_db():
     finally:
         db.close()
 
+
+# Async engine: created on first use so the async driver stays optional
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+_async_engine = None
+_async_sessionmaker = None
+
+
+def async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver configured for {url.get_backend_name()}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        url = async_database_url()
+        options = engine_options(url)
+        try:
+            _async_engine = create_async_engine(
+                url, **({"poolclass": AsyncAdaptedQueuePool, **options} if options else {})
+            )
+        except ImportError as e:
+            raise RuntimeError(
+                f"The async engine needs the {make_url(url).drivername} driver; install it or set ASYNC_DATABASE_URL"
+            ) from e
+        time_statements(_async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
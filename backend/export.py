@@ -0,0 +1,289 @@
+"""
+Streaming bulk export of decisions and their scenarios.
+
+One flat row per scenario (a decision without scenarios gets one row with the
+scenario columns empty). timeline_data, outcomes and risks are flattened into
+a fixed set of columns, so CSV and Parquet exports have the same header
+whatever the data holds. Rows are read with yield_per (a server-side cursor on
+PostgreSQL) and written out EXPORT_CHUNK_ROWS at a time, so memory stays flat
+however many rows there are. Used by GET /api/v1/decisions/export and
+export_data.py.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Query, Session, aliased
+
+import models
+from config import settings
+from fast_json import dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: only Parquet exports need it
+    pyarrow = None
+
+# Yearly financials get one column each, up to the longest simulation horizon
+EXPORT_YEARS = 10
+
+COLUMNS = (
+    ("decision_id", "string"),
+    ("user_id", "string"),
+    ("decision_title", "string"),
+    ("decision_description", "string"),
+    ("category", "string"),
+    ("status", "string"),
+    ("context", "string"),  # JSON
+    ("decision_created_at", "datetime"),
+    ("decision_updated_at", "datetime"),
+    ("scenario_id", "string"),
+    ("version", "int"),
+    ("rank", "int"),
+    ("scenario_title", "string"),
+    ("scenario_description", "string"),
+    ("probability", "float"),
+    ("recommendations", "string"),
+    ("scenario_created_at", "datetime"),
+    *((f"financial_year_{year}", "float") for year in range(1, EXPORT_YEARS + 1)),
+    ("satisfaction", "float"),
+    ("time_investment_hours", "float"),
+    ("mc_paths", "int"),
+    ("mc_expected_value", "float"),
+    ("mc_probability_weighted_value", "float"),
+    ("mc_p10_final", "float"),
+    ("mc_p50_final", "float"),
+    ("mc_p90_final", "float"),
+    ("risk_count", "int"),
+    ("risks_high", "int"),
+    ("risks_medium", "int"),
+    ("risks_low", "int"),
+    ("risks", "string"),  # "severity: factor" joined with " | "
+    ("mitigations", "string"),
+    ("timeline_events", "int"),
+    ("timeline", "string"),  # "period: event (impact)" joined with " | "
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def export_query(db: Session, user_id: Optional[str] = None, versions: str = "latest") -> Query:
+    """
+    Decisions left-joined to their scenarios, in decision then rank order,
+    streamed in chunks; versions="all" includes every stored version
+    """
+    member = models.ScenarioSetMember
+    joined = member.decision_id == models.Decision.id
+    if versions == "latest":
+        newest = aliased(member)
+        joined = and_(joined, member.version == select(func.max(newest.version)).where(
+            newest.decision_id == models.Decision.id
+        ).scalar_subquery())
+
+    query = db.query(
+        models.Decision.id.label("decision_id"),
+        models.Decision.user_id,
+        models.Decision.title.label("decision_title"),
+        models.Decision.description.label("decision_description"),
+        models.Decision.category,
+        models.Decision.status,
+        models.Decision.context,
+        models.Decision.created_at.label("decision_created_at"),
+        models.Decision.updated_at.label("decision_updated_at"),
+        member.version,
+        member.rank,
+        models.Scenario.id.label("scenario_id"),
+        models.Scenario.title.label("scenario_title"),
+        models.Scenario.description.label("scenario_description"),
+        models.Scenario.probability,
+        models.Scenario.recommendations,
+        models.Scenario.created_at.label("scenario_created_at"),
+        models.Scenario.timeline_data,
+        models.Scenario.outcomes,
+        models.Scenario.risks
+    ).select_from(models.Decision).outerjoin(
+        member, joined
+    ).outerjoin(
+        models.Scenario, models.Scenario.id == member.scenario_id
+    )
+    if user_id is not None:
+        query = query.filter(models.Decision.user_id == user_id)
+
+    return query.order_by(
+        models.Decision.created_at, models.Decision.id, member.version, member.rank
+    ).execution_options(yield_per=settings.EXPORT_CHUNK_ROWS)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _integer(value: Any) -> Optional[int]:
+    number = _number(value)
+    return int(number) if number is not None else None
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+def _final(values: Any) -> Optional[float]:
+    return _number(values[-1]) if isinstance(values, list) and values else None
+
+
+def flatten(row: Any) -> Dict[str, Any]:
+    """One export row from an export_query() row, typed as COLUMNS says"""
+    flat = {
+        "decision_id": row.decision_id,
+        "user_id": row.user_id,
+        "decision_title": row.decision_title,
+        "decision_description": row.decision_description,
+        "category": row.category,
+        "status": row.status,
+        "context": json.dumps(row.context, default=str) if row.context else None,
+        "decision_created_at": row.decision_created_at,
+        "decision_updated_at": row.decision_updated_at,
+        "scenario_id": row.scenario_id,
+        "version": row.version,
+        "rank": row.rank,
+        "scenario_title": row.scenario_title,
+        "scenario_description": row.scenario_description,
+        "probability": _number(row.probability),
+        "recommendations": _text(row.recommendations),
+        "scenario_created_at": row.scenario_created_at,
+    }
+
+    outcomes = row.outcomes if isinstance(row.outcomes, dict) else {}
+    financial = outcomes.get("financial") if isinstance(outcomes.get("financial"), dict) else {}
+    for year in range(1, EXPORT_YEARS + 1):
+        flat[f"financial_year_{year}"] = _number(financial.get(f"year_{year}"))
+    flat["satisfaction"] = _number(outcomes.get("satisfaction"))
+    flat["time_investment_hours"] = _number(outcomes.get("time_investment_hours"))
+    monte_carlo = outcomes.get("monte_carlo") if isinstance(outcomes.get("monte_carlo"), dict) else {}
+    flat["mc_paths"] = _integer(monte_carlo.get("paths"))
+    flat["mc_expected_value"] = _number(monte_carlo.get("expected_value"))
+    flat["mc_probability_weighted_value"] = _number(monte_carlo.get("probability_weighted_value"))
+    for percentile in ("p10", "p50", "p90"):
+        flat[f"mc_{percentile}_final"] = _final(monte_carlo.get(percentile))
+
+    risks = [risk for risk in (row.risks or []) if isinstance(risk, dict)]
+    severities = [str(risk.get("severity", "medium")).lower() for risk in risks]
+    flat["risk_count"] = len(risks) if row.scenario_id else None
+    for severity in ("high", "medium", "low"):
+        flat[f"risks_{severity}"] = severities.count(severity) if row.scenario_id else None
+    flat["risks"] = " | ".join(
+        f"{severity}: {risk.get('factor', '')}" for severity, risk in zip(severities, risks)
+    ) or None
+    flat["mitigations"] = " | ".join(str(risk.get("mitigation", "")) for risk in risks) or None
+
+    events = [event for event in (row.timeline_data or []) if isinstance(event, dict)]
+    flat["timeline_events"] = len(events) if row.scenario_id else None
+    flat["timeline"] = " | ".join(
+        f"{event.get('period', '')}: {event.get('event', '')} ({event.get('impact', '')})" for event in events
+    ) or None
+    return flat
+
+
+def export_rows(db: Session, user_id: Optional[str] = None, versions: str = "latest") -> Iterator[Dict[str, Any]]:
+    return map(flatten, export_query(db, user_id, versions))
+
+
+def _chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, settings.EXPORT_CHUNK_ROWS)):
+        yield chunk
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for chunk in _chunks(rows):
+        yield b"".join(dumps(row) + b"\n" for row in chunk)
+
+
+def csv_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for chunk in _chunks(rows):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in map(row.get, COLUMN_NAMES)]
+            for row in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header only: nothing to export
+        yield buffer.getvalue().encode()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file for ParquetWriter whose bytes are handed on as they arrive"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def parquet_schema():
+    types = {
+        "string": pyarrow.string(),
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "datetime": pyarrow.timestamp("us"),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def parquet_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """One row group per chunk; the footer follows the last one"""
+    schema = parquet_schema()
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for chunk in _chunks(rows):
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def encode(rows: Iterable[Dict[str, Any]], file_format: str) -> Iterator[bytes]:
+    """Rows as a stream of byte chunks in one of FORMATS"""
+    if file_format == "parquet":
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow installed")
+        return parquet_chunks(rows)
+    return csv_chunks(rows) if file_format == "csv" else ndjson_chunks(rows)
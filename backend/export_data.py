@@ -0,0 +1,57 @@
+"""
+Bulk export script
+Dumps decisions with their scenarios as NDJSON, CSV or Parquet, streaming
+rows so memory stays flat however large the database is
+
+Usage:
+    python export_data.py --format csv --output decisions.csv
+    python export_data.py --user someone@example.com --versions all > decisions.ndjson
+"""
+import argparse
+import sys
+
+from database import SessionLocal
+from models import User
+import export
+
+
+def export_data(file_format: str, output: str, email: str = None, versions: str = "latest") -> bool:
+    """Write every decision (or one user's) to output; "-" is stdout"""
+    db = SessionLocal()
+    try:
+        user_id = None
+        if email:
+            user = db.query(User).filter(User.email == email.lower()).first()
+            if not user:
+                print(f"❌ No user with email {email}", file=sys.stderr)
+                return False
+            user_id = user.id
+
+        stream = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            for chunk in export.encode(export.export_rows(db, user_id, versions), file_format):
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        if output != "-":
+            print(f"✅ Exported to {output}", file=sys.stderr)
+        return True
+    except Exception as e:
+        print(f"❌ Error exporting data: {e}", file=sys.stderr)
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(export.FORMATS), default="ndjson")
+    parser.add_argument("--output", default="-", help="file to write; - for stdout")
+    parser.add_argument("--user", help="only this user's decisions, by email")
+    parser.add_argument("--versions", choices=("latest", "all"), default="latest",
+                        help="latest simulation run per decision, or every stored one")
+    args = parser.parse_args()
+
+    success = export_data(args.format, args.output, args.user, args.versions)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,56 @@
+"""
+Single-pass JSON responses for the decisions router.
+
+Returning ORM rows through a response_model makes FastAPI validate them into
+the model, validate the result again against response_model (walking every
+timeline/outcomes/risks payload), serialize that to Python objects and then
+run stdlib json.dumps over it. Rows read back from the database were
+validated on the way in, the JSON columns included, so encode_rows() copies
+just the schema's columns off each row and FastJSONResponse encodes the lot
+once: with orjson when it is installed, pydantic-core's encoder otherwise.
+Both format datetimes exactly as the pydantic models do.
+
+Endpoints that return models or rows instead of a FastJSONResponse still go
+through response_model; only the final json.dumps is replaced.
+"""
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # optional: pydantic-core's encoder is nearly as fast
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _row_reader(schema: Type[BaseModel]) -> Tuple[Tuple[str, ...], attrgetter]:
+    """The schema's field names and a getter for those attributes, built once per schema"""
+    names = tuple(schema.model_fields)
+    return names, attrgetter(*names)
+
+
+def encode_row(row: Any, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """The columns `schema` serializes, read straight off an ORM row"""
+    names, getter = _row_reader(schema)
+    values = getter(row)
+    return dict(zip(names, values if len(names) > 1 else (values,)))
+
+
+def encode_rows(rows: Iterable[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    return [encode_row(row, schema) for row in rows]
@@ -0,0 +1,611 @@
+"""
+Background job queue for scenario simulations.
+
+POST /simulate enqueues a job and returns immediately; a pool of asyncio workers
+started with the app runs the generation and persists the scenarios. A decision
+has at most one simulation in flight: repeats of it get that job back (see
+enqueue_simulation), claimed in the backend so this holds across processes.
+POST /simulate:batch enqueues one job covering many decisions (see
+run_batch_simulation_job) whose per-decision progress is kept in `items`; it
+claims each decision the same way (see enqueue_batch_simulation). Streaming
+simulations hold the claim too, under a stand-in job that is never queued
+(see new_stream_job).
+
+Backends:
+  - inprocess: asyncio queue living in this process
+  - redis: Redis list + JSON records at REDIS_URL, shared by every API process
+    (REDIS_URL=memory:// swaps in a local stand-in, handy for tests)
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+
+import ai_service
+import models
+import monte_carlo
+import ranking
+import redis_client
+import scenario_store
+import similarity_index
+from config import settings
+from metrics import span
+
+QUEUE_KEY = "lifeecho:jobs:queue"
+JOB_KEY_PREFIX = "lifeecho:job:"
+CLAIM_KEY_PREFIX = "lifeecho:simulating:"
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class SimulationConflict(Exception):
+    """The decision already has a simulation in flight, with different parameters"""
+
+    def __init__(self, job: Dict[str, Any]):
+        if job["kind"] == "simulate_stream":
+            message = "Decision is already being simulated by a streaming request; wait for it to finish"
+        else:
+            message = (
+                f"Decision is already being simulated by job {job['id']}; "
+                f"wait for it to finish or poll /api/v1/jobs/{job['id']}"
+            )
+        super().__init__(message)
+        self.job = job
+
+
+class JobBackend(ABC):
+    """Storage and queue for job records"""
+
+    @abstractmethod
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def dequeue(self, timeout: float = 1.0) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def update(self, job_id: str, **fields) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, decision_id: str, fingerprint: str, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Make `job` the decision's in-flight simulation, or return the existing
+        claim ({"fingerprint", "job"}) instead. The claim carries the job so
+        callers arriving before it is enqueued can still join it.
+        """
+
+    @abstractmethod
+    async def release(self, decision_id: str, job_id: str) -> None:
+        """Drop the decision's claim if job_id still holds it"""
+
+
+class InProcessBackend(JobBackend):
+    """Jobs live in this process only; lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._claims: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["id"]] = dict(job)
+        await self.queue.put(job["id"])
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    async def claim(self, decision_id: str, fingerprint: str, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # No awaits: atomic on the event loop
+        existing = self._claims.get(decision_id)
+        if existing is not None:
+            return {"fingerprint": existing["fingerprint"], "job": dict(existing["job"])}
+        self._claims[decision_id] = {"fingerprint": fingerprint, "job": dict(job)}
+        return None
+
+    async def release(self, decision_id: str, job_id: str) -> None:
+        claim = self._claims.get(decision_id)
+        if claim is not None and claim["job"]["id"] == job_id:
+            del self._claims[decision_id]
+
+
+class RedisBackend(JobBackend):
+    """Jobs shared through Redis so any API process can run or report them"""
+
+    def __init__(self, client, ttl_seconds: int = 86400, claim_ttl_seconds: int = 900):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.claim_ttl_seconds = claim_ttl_seconds
+
+    async def enqueue(self, job: Dict[str, Any]) -> None:
+        await self.client.set(JOB_KEY_PREFIX + job["id"], json.dumps(job), ex=self.ttl_seconds)
+        await self.client.lpush(QUEUE_KEY, job["id"])
+
+    async def dequeue(self, timeout: float = 1.0) -> Optional[str]:
+        item = await self.client.brpop([QUEUE_KEY], timeout=max(1, int(timeout)))
+        return item[1] if item else None
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(JOB_KEY_PREFIX + job_id)
+        return json.loads(raw) if raw else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        job = await self.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        await self.client.set(JOB_KEY_PREFIX + job_id, json.dumps(job), ex=self.ttl_seconds)
+
+    async def claim(self, decision_id: str, fingerprint: str, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # SET NX is the cross-process lock; the TTL frees decisions whose worker died mid-job
+        value = json.dumps({"fingerprint": fingerprint, "job": job})
+        key = CLAIM_KEY_PREFIX + decision_id
+        for _ in range(3):
+            if await self.client.set(key, value, ex=self.claim_ttl_seconds, nx=True):
+                return None
+            raw = await self.client.get(key)
+            if raw:
+                return json.loads(raw)
+            # Released between SET and GET; try again
+        raise RuntimeError(f"Could not claim decision {decision_id}")
+
+    async def release(self, decision_id: str, job_id: str) -> None:
+        key = CLAIM_KEY_PREFIX + decision_id
+        raw = await self.client.get(key)
+        if raw and json.loads(raw)["job"]["id"] == job_id:
+            await self.client.delete(key)
+
+
+def create_backend() -> JobBackend:
+    if settings.JOB_BACKEND == "redis":
+        return RedisBackend(redis_client.get_redis(), settings.JOB_TTL_SECONDS, settings.SIMULATE_CLAIM_TTL_SECONDS)
+    return InProcessBackend()
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def simulation_params(
+    decision: models.Decision,
+    num_scenarios: int,
+    time_horizon_years: int,
+    force_refresh: bool = False
+) -> Dict[str, Any]:
+    """Keyword arguments for ai_service's generators, detached from the ORM row"""
+    return {
+        "decision_title": decision.title,
+        "decision_description": decision.description or "",
+        "category": decision.category,
+        "context": decision.context or {},
+        "num_scenarios": num_scenarios,
+        "time_horizon_years": time_horizon_years,
+        "force_refresh": force_refresh,
+    }
+
+
+def new_simulation_job(
+    decision: models.Decision,
+    num_scenarios: int,
+    time_horizon_years: int,
+    force_refresh: bool = False,
+    num_paths: int = 0,
+    ranking_weights: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Build a job record carrying everything the worker needs to generate scenarios"""
+    return {
+        "id": str(uuid.uuid4()),
+        "kind": "simulate",
+        "status": "queued",
+        "user_id": decision.user_id,
+        "decision_id": decision.id,
+        "params": simulation_params(decision, num_scenarios, time_horizon_years, force_refresh),
+        "num_paths": num_paths,
+        "ranking_weights": ranking_weights,
+        "scenario_ids": [],
+        "error": None,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+async def run_simulation_job(job: Dict[str, Any]) -> List[str]:
+    """Generate scenarios without holding a DB session, then persist them"""
+    with span("job.generate"):
+        scenarios_data = await ai_service.generate_scenarios_async(
+            **job["params"], user_id=job["user_id"], decision_ids=[job["decision_id"]]
+        )
+    if job.get("num_paths"):
+        with span("job.monte_carlo"):
+            await asyncio.to_thread(
+                monte_carlo.annotate_scenarios,
+                scenarios_data, job["params"]["time_horizon_years"], job["num_paths"]
+            )
+    ranking.rank_scenarios(scenarios_data, job.get("ranking_weights"))
+    with span("job.persist"):
+        scenario_ids = await asyncio.to_thread(scenario_store.add_version, job["decision_id"], scenarios_data)
+    # Now a source for near-duplicates here, even if another process created it
+    similarity_index.index_params(job["decision_id"], job["user_id"], job["params"])
+    return scenario_ids
+
+
+def new_batch_simulation_job(
+    user_id: str,
+    decisions: List[models.Decision],
+    missing_ids: List[str],
+    num_scenarios: int,
+    time_horizon_years: int,
+    force_refresh: bool = False,
+    num_paths: int = 0,
+    ranking_weights: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Job record for many decisions; ids that weren't found start out failed"""
+    items = [
+        {"decision_id": decision.id, "status": "queued", "scenario_ids": [], "error": None}
+        for decision in decisions
+    ] + [
+        {"decision_id": decision_id, "status": "failed", "scenario_ids": [], "error": "Decision not found"}
+        for decision_id in missing_ids
+    ]
+    return {
+        "id": str(uuid.uuid4()),
+        "kind": "simulate_batch",
+        "status": "queued",
+        "user_id": user_id,
+        "decision_id": None,
+        "params": {
+            decision.id: simulation_params(decision, num_scenarios, time_horizon_years, force_refresh)
+            for decision in decisions
+        },
+        "num_paths": num_paths,
+        "ranking_weights": ranking_weights,
+        "items": items,
+        "progress": batch_progress(items),
+        "scenario_ids": [],
+        "error": None,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+def new_stream_job(decision: models.Decision) -> Dict[str, Any]:
+    """
+    Stand-in job a streaming simulation claims its decision with. It is never
+    queued or stored, so nothing can join or poll it; others get SimulationConflict.
+    """
+    return {
+        "id": str(uuid.uuid4()),
+        "kind": "simulate_stream",
+        "status": "running",
+        "user_id": decision.user_id,
+        "decision_id": decision.id,
+        "created_at": _now(),
+    }
+
+
+def batch_progress(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    progress = {"total": len(items), "queued": 0, "completed": 0, "failed": 0, "joined": 0}
+    for item in items:
+        progress[item["status"]] += 1
+    return progress
+
+
+async def run_batch_simulation_job(job: Dict[str, Any], backend: JobBackend) -> Dict[str, Any]:
+    """
+    Generate for every decision the batch job claimed and persist in bulk.
+
+    Decisions with identical generation parameters share one provider call.
+    Groups run concurrently; ai_service bounds the actual provider calls by
+    LLM_MAX_CONCURRENCY and LLM_TOKENS_PER_MINUTE. Finished decisions are
+    written BATCH_FLUSH_SIZE at a time in one transaction each; after every
+    write job progress is updated and the finished decisions' claims released.
+    job["items"] is updated in place.
+    """
+    items = {item["decision_id"]: item for item in job["items"]}
+    groups: Dict[str, List[str]] = {}
+    for decision_id, params in job["params"].items():
+        groups.setdefault(json.dumps(params, sort_keys=True, default=str), []).append(decision_id)
+
+    async def generate(decision_ids: List[str]):
+        params = job["params"][decision_ids[0]]
+        scenarios = await ai_service.generate_scenarios_async(
+            **params, user_id=job["user_id"], decision_ids=decision_ids
+        )
+        if job.get("num_paths"):
+            await asyncio.to_thread(
+                monte_carlo.annotate_scenarios, scenarios, params["time_horizon_years"], job["num_paths"]
+            )
+        ranking.rank_scenarios(scenarios, job.get("ranking_weights"))
+        return scenarios
+
+    async def generate_group(decision_ids: List[str]):
+        try:
+            return decision_ids, await generate(decision_ids), None
+        except Exception as e:
+            return decision_ids, None, str(e)
+
+    pending: Dict[str, List[Dict[str, Any]]] = {}
+    failed: List[str] = []
+
+    def fail(decision_ids: List[str], error: str) -> None:
+        for decision_id in decision_ids:
+            items[decision_id].update(status="failed", error=error)
+        failed.extend(decision_ids)
+
+    async def flush() -> None:
+        batch = dict(pending)
+        pending.clear()
+        finished = [*batch, *failed]
+        if batch:
+            try:
+                saved = await asyncio.to_thread(scenario_store.add_versions, batch)
+            except Exception as e:
+                print(f"Error saving batch job {job['id']}: {e}")
+                fail(list(batch), str(e))
+            else:
+                for decision_id in batch:
+                    if decision_id in saved:
+                        items[decision_id].update(status="completed", scenario_ids=saved[decision_id])
+                        similarity_index.index_params(decision_id, job["user_id"], job["params"][decision_id])
+                    else:
+                        fail([decision_id], "Decision no longer exists")
+        if failed:
+            await asyncio.to_thread(scenario_store.set_decisions_status, list(failed), "draft")
+            failed.clear()
+        await backend.update(job["id"], items=job["items"], progress=batch_progress(job["items"]))
+        # Only after the update, as in WorkerPool._run
+        for decision_id in finished:
+            await backend.release(decision_id, job["id"])
+
+    tasks = [asyncio.create_task(generate_group(decision_ids)) for decision_ids in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            decision_ids, scenarios, error = await next_done
+            if error is not None:
+                fail(decision_ids, error)
+            else:
+                for decision_id in decision_ids:
+                    pending[decision_id] = copy.deepcopy(scenarios)
+            if len(pending) >= settings.BATCH_FLUSH_SIZE or failed:
+                await flush()
+        await flush()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    progress = batch_progress(job["items"])
+    if progress["failed"] == 0:
+        return {"status": "completed", "progress": progress}
+    return {
+        "status": "failed" if progress["completed"] == 0 else "partial",
+        "progress": progress,
+        "error": f"{progress['failed']} of {progress['total']} decisions failed",
+    }
+
+
+def unfinished_decision_ids(job: Dict[str, Any]) -> List[str]:
+    """Decisions left in 'simulating' if the job stops early"""
+    if job["kind"] == "simulate_batch":
+        return [item["decision_id"] for item in job["items"] if item["status"] == "queued"]
+    return [job["decision_id"]]
+
+
+class WorkerPool:
+    """Fixed number of asyncio workers draining the backend queue"""
+
+    def __init__(self, backend: JobBackend, concurrency: int):
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while self._running:
+            try:
+                job_id = await self.backend.dequeue(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error reading job queue: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if job_id:
+                await self._run(job_id)
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.backend.get(job_id)
+        if not job:
+            return
+        await self.backend.update(job_id, status="running", started_at=_now())
+        try:
+            if job["kind"] == "simulate_batch":
+                result = await run_batch_simulation_job(job, self.backend)
+            else:
+                result = {"status": "completed", "scenario_ids": await run_simulation_job(job)}
+        except asyncio.CancelledError:
+            await self.backend.update(job_id, status="failed", error="Cancelled", finished_at=_now())
+            await asyncio.to_thread(scenario_store.set_decisions_status, unfinished_decision_ids(job), "draft")
+            raise
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            await self.backend.update(job_id, status="failed", error=str(e), finished_at=_now())
+            await asyncio.to_thread(scenario_store.set_decisions_status, unfinished_decision_ids(job), "draft")
+        else:
+            await self.backend.update(job_id, finished_at=_now(), **result)
+        finally:
+            # After the final update, so callers that joined see the result before a new run can start
+            if job["kind"] == "simulate_batch":
+                for decision_id in job["params"]:
+                    await self.backend.release(decision_id, job_id)
+            else:
+                await self.backend.release(job["decision_id"], job_id)
+
+
+backend = create_backend()
+workers = WorkerPool(backend, settings.JOB_WORKERS)
+
+
+# Simulate calls started, joined to an identical in-flight job, or refused for a different one
+coalesce_stats = {"started": 0, "joined": 0, "conflicts": 0}
+
+
+def simulation_fingerprint(job: Dict[str, Any], decision_id: Optional[str] = None) -> str:
+    """
+    Identifies identical simulations of a decision: same decision content and
+    request parameters. Pass decision_id for one decision of a batch job.
+    """
+    params = job["params"][decision_id] if decision_id is not None else job["params"]
+    payload = json.dumps([params, job.get("num_paths"), job.get("ranking_weights")], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def claim_simulation(decision_id: str, fingerprint: str, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Claim the decision for `job`. Returns None once claimed, or the identical
+    simulation already in flight for it; a different one raises SimulationConflict.
+    """
+    for _ in range(3):
+        claim = await backend.claim(decision_id, fingerprint, job)
+        if claim is None:
+            return None
+        # No record yet means its claimant is still between claiming and enqueueing
+        current = await backend.get(claim["job"]["id"]) or claim["job"]
+        if current["status"] not in ACTIVE_STATUSES:
+            # The holder finished without releasing (e.g. a worker died between the two)
+            await backend.release(decision_id, current["id"])
+            continue
+        if claim["fingerprint"] != fingerprint:
+            coalesce_stats["conflicts"] += 1
+            raise SimulationConflict(current)
+        coalesce_stats["joined"] += 1
+        return current
+    raise RuntimeError(f"Could not claim decision {decision_id}")
+
+
+async def enqueue_simulation(job: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Single-flight per decision: enqueue `job` unless the decision already has
+    a simulation queued or running. An identical one is returned instead, so
+    retries and double submits share one provider call; a different one
+    raises SimulationConflict. Returns (job, joined).
+
+    Only the caller that starts a job marks the decision simulating: a joiner
+    doing it could land after the job's own "completed" and stick.
+    """
+    decision_id = job["decision_id"]
+    current = await claim_simulation(decision_id, simulation_fingerprint(job), job)
+    if current is not None:
+        return current, True
+    try:
+        # Before enqueueing, so it can't overwrite the worker's final status
+        await asyncio.to_thread(scenario_store.set_decision_status, decision_id, "simulating")
+        await backend.enqueue(job)
+    except Exception:
+        await backend.release(decision_id, job["id"])
+        await asyncio.to_thread(scenario_store.set_decision_status, decision_id, "draft")
+        raise
+    coalesce_stats["started"] += 1
+    return job, False
+
+
+async def enqueue_batch_simulation(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    enqueue_simulation for each decision of a batch job. A decision with an
+    identical simulation in flight is attached to it: its item is "joined",
+    with that job's id, and this job leaves it alone. One with a different
+    simulation in flight fails with the conflict. The job claims and
+    generates the rest; it is enqueued even if that leaves none, so its
+    record still reports every item.
+    """
+    items = {item["decision_id"]: item for item in job["items"]}
+    # Every claim carries the job; without params and items it stays small however big the batch
+    holder = {key: value for key, value in job.items() if key not in ("params", "items", "progress")}
+    claimed: List[str] = []
+    try:
+        for decision_id in list(job["params"]):
+            try:
+                current = await claim_simulation(decision_id, simulation_fingerprint(job, decision_id), holder)
+            except SimulationConflict as e:
+                items[decision_id].update(status="failed", error=str(e))
+                current = None
+            else:
+                if current is None:
+                    claimed.append(decision_id)
+                    continue
+                items[decision_id].update(status="joined", job_id=current["id"])
+            del job["params"][decision_id]
+        job["progress"] = batch_progress(job["items"])
+        await asyncio.to_thread(scenario_store.set_decisions_status, claimed, "simulating")
+        await backend.enqueue(job)
+    except Exception:
+        for decision_id in claimed:
+            await backend.release(decision_id, job["id"])
+        await asyncio.to_thread(scenario_store.set_decisions_status, claimed, "draft")
+        raise
+    coalesce_stats["started"] += len(claimed)
+    return job
+
+
+def submit_simulation(job: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """enqueue_simulation from a sync endpoint running in FastAPI's worker threads"""
+    return anyio.from_thread.run(enqueue_simulation, job)
+
+
+def submit_batch_simulation(job: Dict[str, Any]) -> Dict[str, Any]:
+    """enqueue_batch_simulation from a sync endpoint"""
+    return anyio.from_thread.run(enqueue_batch_simulation, job)
+
+
+def claim_stream(job: Dict[str, Any]) -> None:
+    """
+    From a sync endpoint: claim the decision for a new_stream_job. Its
+    fingerprint is unique, so any simulation in flight raises SimulationConflict.
+    """
+    anyio.from_thread.run(claim_simulation, job["decision_id"], f"stream:{job['id']}", job)
+    coalesce_stats["started"] += 1
+
+
+async def release_stream(job: Dict[str, Any]) -> None:
+    await backend.release(job["decision_id"], job["id"])
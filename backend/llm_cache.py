@@ -0,0 +1,94 @@
+"""
+Content-addressed cache for LLM completions.
+
+Keys are a SHA-256 of the whitespace-normalized prompt, model and temperature,
+so re-simulating an unchanged decision reuses the earlier completion text.
+
+Tiers:
+  - memory: per-process LRU bounded by LLM_CACHE_MAX_ENTRIES, entries expire
+    after LLM_CACHE_TTL_SECONDS
+  - redis: shared across processes at REDIS_URL (LLM_CACHE_REDIS=true), expired
+    by TTL; size eviction is left to the server's maxmemory policy
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+import redis_client
+from config import settings
+from ttl_cache import LRUCache
+
+KEY_PREFIX = "lifeecho:llm:"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so cosmetic prompt changes don't bust the cache"""
+    return " ".join(prompt.split())
+
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    payload = json.dumps(
+        {"prompt": normalize_prompt(prompt), "model": model, "temperature": round(temperature, 4)},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory, then Redis) cache of completion text with hit/miss counters"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, use_redis: bool = False):
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self.counters: Dict[str, int] = {"hits": 0, "memory_hits": 0, "redis_hits": 0, "misses": 0, "errors": 0}
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(True, "memory_hits")
+            return value
+        if self.use_redis:
+            try:
+                value = await redis_client.get_redis().get(KEY_PREFIX + key)
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"LLM cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count(True, "redis_hits")
+                return value
+        self._count(False)
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.use_redis:
+            try:
+                await redis_client.get_redis().set(KEY_PREFIX + key, value, ex=self.ttl_seconds)
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"LLM cache write failed: {e}")
+
+    def _count(self, hit: bool, tier: str = "") -> None:
+        if hit:
+            self.counters["hits"] += 1
+            self.counters[tier] += 1
+        else:
+            self.counters["misses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES if settings.LLM_CACHE_ENABLED else 0,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    use_redis=settings.LLM_CACHE_ENABLED and settings.LLM_CACHE_REDIS
+)
@@ -0,0 +1,488 @@
+"""
+LLM providers and the router that chooses between them.
+
+Each provider wraps one API behind the same small interface (complete,
+stream). ProviderRouter fronts the providers listed in
+LLM_PROVIDERS (in preference order) and adds:
+
+  - latency-aware routing: healthy providers are tried fastest median first
+    (LLM_HEDGE_DELAY_SECONDS standing in until a provider has a history)
+  - hedging: if the first provider hasn't answered by its own p95 latency,
+    the next one is started as well and whichever answers first wins
+  - a circuit breaker per provider: after LLM_BREAKER_FAILURES consecutive
+    failures it is skipped for LLM_BREAKER_RESET_SECONDS, then a single
+    trial call decides whether it closes again
+  - retries with full-jitter exponential backoff once every candidate failed
+
+Anthropic is called over its HTTP API with httpx (installed with the OpenAI
+SDK). The stub provider answers locally, for tests and load runs.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from config import settings
+
+ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+# Below this many successful calls a provider's latency percentiles are unknown
+MIN_LATENCY_SAMPLES = 20
+
+
+class LLMUnavailable(Exception):
+    """No provider produced a completion"""
+
+
+@dataclass
+class Completion:
+    text: str
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class Provider(ABC):
+    """
+    One completion API. `options` carries temperature, max_tokens and
+    json_mode; each provider maps them onto its own request format.
+    """
+    name = "provider"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], options: Dict[str, Any]) -> Completion:
+        ...
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], options: Dict[str, Any]) -> AsyncIterator[str]:
+        ...
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str, timeout: float, base_url: Optional[str] = None):
+        super().__init__(model)
+        # The router owns retries and failover, so the SDK's own retries are off
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+
+    def _request(self, messages: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": options["temperature"],
+            "max_tokens": options["max_tokens"],
+        }
+        if options.get("json_mode"):
+            # Structured output: the provider guarantees a single valid JSON object
+            request["response_format"] = {"type": "json_object"}
+        return request
+
+    def _completion(self, response) -> Completion:
+        usage = response.usage
+        return Completion(
+            text=response.choices[0].message.content or "",
+            provider=self.name,
+            model=self.model,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+        )
+
+    async def complete(self, messages, options):
+        return self._completion(await self.async_client.chat.completions.create(**self._request(messages, options)))
+
+    async def stream(self, messages, options):
+        stream = await self.async_client.chat.completions.create(**self._request(messages, options), stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class AnthropicProvider(Provider):
+    name = "anthropic"
+
+    def __init__(self, api_key: str, model: str, timeout: float):
+        super().__init__(model)
+        headers = {"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION}
+        self.async_client = httpx.AsyncClient(headers=headers, timeout=timeout)
+
+    def _request(self, messages: List[Dict[str, str]], options: Dict[str, Any]) -> Dict[str, Any]:
+        # System prompts are a top-level field in the Messages API, not a message
+        return {
+            "model": self.model,
+            "system": "\n".join(m["content"] for m in messages if m["role"] == "system"),
+            "messages": [m for m in messages if m["role"] != "system"],
+            "temperature": min(options["temperature"], 1.0),
+            "max_tokens": options["max_tokens"],
+        }
+
+    def _completion(self, data: Dict[str, Any]) -> Completion:
+        usage = data.get("usage") or {}
+        return Completion(
+            text="".join(block.get("text", "") for block in data.get("content", []) if block.get("type") == "text"),
+            provider=self.name,
+            model=self.model,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+        )
+
+    async def complete(self, messages, options):
+        response = await self.async_client.post(ANTHROPIC_URL, json=self._request(messages, options))
+        response.raise_for_status()
+        return self._completion(response.json())
+
+    async def stream(self, messages, options):
+        request = {**self._request(messages, options), "stream": True}
+        async with self.async_client.stream("POST", ANTHROPIC_URL, json=request) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:])
+                if event.get("type") == "content_block_delta" and event["delta"].get("text"):
+                    yield event["delta"]["text"]
+                elif event.get("type") == "error":
+                    raise RuntimeError(event.get("error", {}).get("message", "stream error"))
+
+
+def stub_scenario(index: int) -> Dict[str, Any]:
+    return {
+        "title": f"Stub Scenario {index + 1}",
+        "probability": round(0.6 - 0.1 * index, 2),
+        "description": "Canned scenario from the local stub provider.",
+        "timeline": [{"period": "Year 1", "event": "First milestone", "impact": "positive"}],
+        "outcomes": {"financial": {"year_1": 10000 * (index + 1)}, "satisfaction": 7.0 - index},
+        "risks": [{"factor": "Stub risk", "severity": "medium", "mitigation": "None needed"}],
+        "recommendations": "Replace the stub provider with a real one.",
+    }
+
+
+class StubProvider(Provider):
+    """Answers locally with canned scenarios after `latency` seconds; fails at `failure_rate`"""
+    name = "stub"
+
+    def __init__(self, model: str = "stub", latency: float = 0.0, failure_rate: float = 0.0, name: str = "stub"):
+        super().__init__(model)
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def _completion(self, messages: List[Dict[str, str]]) -> Completion:
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError(f"{self.name} failed")
+        match = re.search(r"(\d+) distinct", messages[-1]["content"])
+        count = int(match.group(1)) if match else 3
+        text = json.dumps({"scenarios": [stub_scenario(i) for i in range(count)]})
+        return Completion(text, self.name, self.model, completion_tokens=len(text) // 4)
+
+    async def complete(self, messages, options):
+        await asyncio.sleep(self.latency)
+        return self._completion(messages)
+
+    async def stream(self, messages, options):
+        await asyncio.sleep(self.latency)
+        text = self._completion(messages).text
+        for offset in range(0, len(text), 64):
+            yield text[offset:offset + 64]
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures -> half-open after `reset_seconds`"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; half-open admits one trial call at a time"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            # A failed half-open trial re-opens straight away
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self) -> None:
+        """The call was abandoned (e.g. lost a hedge race); no verdict either way"""
+        with self._lock:
+            self._trial = False
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProviderState:
+    def __init__(self, provider: Provider, breaker: CircuitBreaker):
+        self.provider = provider
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.counters = {"calls": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.latency.quantile(0.5), self.latency.quantile(0.95)
+        return {
+            "model": self.provider.model,
+            "state": self.breaker.state,
+            **self.counters,
+            "p50_seconds": round(p50, 4) if p50 is not None else None,
+            "p95_seconds": round(p95, 4) if p95 is not None else None,
+        }
+
+
+class ProviderRouter:
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge: bool = True,
+        hedge_delay_seconds: float = 10.0,
+        hedge_min_delay_seconds: float = 0.5,
+        max_retries: int = 2,
+        retry_base_seconds: float = 0.5,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30.0
+    ):
+        self.states = [ProviderState(p, CircuitBreaker(breaker_failures, breaker_reset_seconds)) for p in providers]
+        self.hedge = hedge
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self.max_retries = max(0, max_retries)
+        self.retry_base_seconds = retry_base_seconds
+
+    @property
+    def model_key(self) -> str:
+        """Identifies the configured models, for cache keys"""
+        return ",".join(state.provider.model for state in self.states)
+
+    def ranked(self) -> List[ProviderState]:
+        """
+        Providers not currently broken, fastest median first. One without a
+        latency history counts as taking hedge_delay_seconds, so it doesn't
+        jump ahead of measured providers; the sort is stable, so config order
+        decides among equals.
+        """
+        def median(state: ProviderState) -> float:
+            p50 = state.latency.quantile(0.5)
+            return p50 if p50 is not None else self.hedge_delay_seconds
+
+        states = [state for state in self.states if state.breaker.state != "open"]
+        return sorted(states, key=median)
+
+    def hedge_delay(self, state: ProviderState) -> float:
+        p95 = state.latency.quantile(0.95)
+        return max(p95 if p95 is not None else self.hedge_delay_seconds, self.hedge_min_delay_seconds)
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying clients from synchronizing
+        return random.uniform(0, self.retry_base_seconds * 2 ** attempt)
+
+    def _succeeded(self, state: ProviderState, started: float) -> None:
+        state.latency.record(time.monotonic() - started)
+        state.breaker.record_success()
+
+    def _failed(self, state: ProviderState, error: Exception) -> None:
+        state.counters["failures"] += 1
+        state.breaker.record_failure()
+        print(f"LLM provider {state.provider.name} failed: {error}")
+
+    async def _call(self, state: ProviderState, messages, options) -> Completion:
+        state.counters["calls"] += 1
+        started = time.monotonic()
+        try:
+            completion = await state.provider.complete(messages, options)
+        except asyncio.CancelledError:
+            state.breaker.release()
+            raise
+        except Exception as e:
+            self._failed(state, e)
+            raise
+        self._succeeded(state, started)
+        return completion
+
+    async def _attempt(self, messages, options) -> Completion:
+        """One pass over the candidates, hedging slow calls and failing over on errors"""
+        queue = self.ranked()
+        tasks: Dict[asyncio.Task, tuple] = {}
+        errors: List[str] = []
+
+        def launch(hedged: bool) -> bool:
+            while queue:
+                state = queue.pop(0)
+                if state.breaker.allow():
+                    if hedged:
+                        state.counters["hedges"] += 1
+                    tasks[asyncio.create_task(self._call(state, messages, options))] = (state, hedged)
+                    return True
+            return False
+
+        launch(hedged=False)
+        try:
+            while tasks:
+                delay = None
+                if self.hedge and len(tasks) == 1 and queue:
+                    delay = self.hedge_delay(next(iter(tasks.values()))[0])
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than its p95: race the next provider against it
+                    launch(hedged=True)
+                    continue
+                for task in done:
+                    state, hedged = tasks.pop(task)
+                    if task.exception() is None:
+                        if hedged:
+                            state.counters["hedge_wins"] += 1
+                        return task.result()
+                    errors.append(f"{state.provider.name}: {task.exception()}")
+                if not tasks:
+                    launch(hedged=False)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        raise LLMUnavailable("; ".join(errors) or "No LLM provider available")
+
+    async def complete(self, messages: List[Dict[str, str]], options: Dict[str, Any]) -> Completion:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._attempt(messages, options)
+            except LLMUnavailable as e:
+                error = e
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff(attempt))
+        raise error
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        options: Dict[str, Any],
+        info: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the best available provider, failing over only until the
+        first chunk arrives. `info` receives the provider and model that answered.
+        """
+        errors: List[str] = []
+        for attempt in range(self.max_retries + 1):
+            for state in self.ranked():
+                if not state.breaker.allow():
+                    continue
+                state.counters["calls"] += 1
+                started = time.monotonic()
+                streamed = False
+                try:
+                    async for chunk in state.provider.stream(messages, options):
+                        if not streamed and info is not None:
+                            info.update(provider=state.provider.name, model=state.provider.model)
+                        streamed = True
+                        yield chunk
+                except (asyncio.CancelledError, GeneratorExit):
+                    state.breaker.release()
+                    raise
+                except Exception as e:
+                    self._failed(state, e)
+                    if streamed:
+                        raise
+                    errors.append(f"{state.provider.name}: {e}")
+                    continue
+                self._succeeded(state, started)
+                return
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff(attempt))
+        raise LLMUnavailable("; ".join(errors) or "No LLM provider available")
+
+    def stats(self) -> Dict[str, Any]:
+        return {state.provider.name: state.stats() for state in self.states}
+
+
+def build_providers() -> List[Provider]:
+    """Providers named in LLM_PROVIDERS that have credentials, in that order"""
+    providers: List[Provider] = []
+    for name in (name.strip().lower() for name in settings.LLM_PROVIDERS.split(",")):
+        if name == "openai" and settings.OPENAI_API_KEY:
+            providers.append(OpenAIProvider(
+                settings.OPENAI_API_KEY, settings.OPENAI_MODEL, settings.LLM_TIMEOUT_SECONDS, settings.OPENAI_BASE_URL or None
+            ))
+        elif name == "anthropic" and settings.ANTHROPIC_API_KEY:
+            providers.append(
+                AnthropicProvider(settings.ANTHROPIC_API_KEY, settings.ANTHROPIC_MODEL, settings.LLM_TIMEOUT_SECONDS)
+            )
+        elif name == "stub":
+            providers.append(StubProvider(latency=settings.LLM_STUB_LATENCY_SECONDS))
+    return providers
+
+
+def build_router(providers: Optional[List[Provider]] = None) -> Optional[ProviderRouter]:
+    providers = build_providers() if providers is None else providers
+    if not providers:
+        return None
+    return ProviderRouter(
+        providers,
+        hedge=settings.LLM_HEDGE_ENABLED,
+        hedge_delay_seconds=settings.LLM_HEDGE_DELAY_SECONDS,
+        hedge_min_delay_seconds=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        retry_base_seconds=settings.LLM_RETRY_BASE_SECONDS,
+        breaker_failures=settings.LLM_BREAKER_FAILURES,
+        breaker_reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+    )
+
+
+# None when no provider is configured; ai_service then serves mock scenarios
+router = build_router()
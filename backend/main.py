@@ -1,8 +1,19 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from config import settings
-from database import engine, Base
-from routers import auth_router, decisions_router
+from sqlalchemy import text
+from database import engine, Base, dispose_async_engine, pool_metrics
+from routers import auth_router, decisions_router, jobs_router, scenarios_router
+import jobs
+import llm_providers
+import metrics
+import password_hashing
+import similarity_index
+from profiling import SamplingProfiler
+from llm_cache import response_cache
+from tokens import load_encoding, token_usage
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -22,9 +33,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms, plus stack dumps for slow requests when profiling is on
+profiler = None
+if settings.PROFILE_SLOW_REQUESTS_SECONDS > 0:
+    profiler = SamplingProfiler(
+        threshold=settings.PROFILE_SLOW_REQUESTS_SECONDS,
+        interval=settings.PROFILE_INTERVAL_SECONDS,
+        window=settings.PROFILE_WINDOW_SECONDS,
+        output_dir=settings.PROFILE_DIR,
+        max_files=settings.PROFILE_MAX_FILES
+    )
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware, profiler=profiler)
+
 # Include routers
 app.include_router(auth_router.router)
 app.include_router(decisions_router.router)
+app.include_router(jobs_router.router)
+app.include_router(scenarios_router.router)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    # A cold tiktoken cache means a download; keep it off the event loop and
+    # finish it before workers or requests need token counts
+    await asyncio.to_thread(load_encoding)
+    await jobs.workers.start()
+    similarity_index.start_rebuild()
+    if profiler is not None:
+        profiler.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await jobs.workers.stop()
+    await dispose_async_engine()
+    password_hashing.pool.shutdown()
+    if profiler is not None:
+        profiler.stop()
 
 
 @app.get("/")
@@ -45,7 +91,7 @@ def health_check():
     db_status = "unknown"
     try:
         db = SessionLocal()
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         db.close()
         db_status = "connected"
     except Exception as e:
@@ -54,10 +100,35 @@ def health_check():
     return {
         "status": "healthy",
         "app": settings.APP_NAME,
-        "database": db_status
+        "database": db_status,
+        "db_pool": pool_metrics(),
+        "llm_cache": response_cache.stats(),
+        "llm_providers": llm_providers.router.stats() if llm_providers.router else {},
+        "llm_tokens": token_usage.stats(),
+        "simulate_coalescing": dict(jobs.coalesce_stats),
+        "similarity_index": dict(similarity_index.index.stats)
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition: latency histograms plus the counters /health reports"""
+    tokens = token_usage.stats()
+    gauges = (
+        metrics.stats_lines(f"{metrics.PREFIX}_db_pool", pool_metrics())
+        + metrics.stats_lines(f"{metrics.PREFIX}_llm_cache", response_cache.stats())
+        + metrics.stats_lines(f"{metrics.PREFIX}_simulate_coalescing", jobs.coalesce_stats)
+        + metrics.stats_lines(f"{metrics.PREFIX}_similarity_index", similarity_index.index.stats)
+        + metrics.stats_lines(f"{metrics.PREFIX}_llm_tokens", tokens["providers"], label="provider")
+        + metrics.stats_lines(
+            f"{metrics.PREFIX}_llm_provider",
+            llm_providers.router.stats() if llm_providers.router else {},
+            label="provider"
+        )
+    )
+    return Response(metrics.exposition(gauges), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,179 @@
+"""
+Prometheus-style metrics for GET /metrics.
+
+Latency histograms are kept here: whole requests (MetricsMiddleware), named
+spans around the hot paths (auth, simulate, LLM stages) and database
+statements. The counters other modules already keep (pool, LLM cache, tokens,
+providers) are rendered as gauges by stats_lines at scrape time.
+"""
+import bisect
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Response appends the charset
+PREFIX = "lifeecho"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+UNMATCHED_ROUTE = "unmatched"
+
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+request_seconds = Histogram(
+    f"{PREFIX}_http_request_duration_seconds", "Request latency, including streamed bodies",
+    ("method", "route", "status")
+)
+span_seconds = Histogram(
+    f"{PREFIX}_span_duration_seconds", "Time in instrumented sections of the request and job paths", ("span",)
+)
+db_seconds = Histogram(
+    f"{PREFIX}_db_statement_duration_seconds", "Database statement execution time", ("statement",), DB_BUCKETS
+)
+HISTOGRAMS = (request_seconds, span_seconds, db_seconds)
+
+
+class span:
+    """
+    `with span("llm.parse"):` times the block into the span histogram. Wall
+    time, so it works around awaits too. A class rather than @contextmanager,
+    which costs about 3x as much per use.
+    """
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        span_seconds.observe(time.perf_counter() - self.start, self.name)
+
+
+def stats_lines(name: str, stats: Dict[str, Any], label: Optional[str] = None) -> List[str]:
+    """
+    Gauges from a stats dict: numbers and bools as-is, strings as `<name>_<key>_info{<key>="..."} 1`.
+    With `label`, stats maps label values (e.g. provider names) to such dicts.
+    """
+    groups = stats.items() if label else [(None, stats)]
+    lines = []
+    for label_value, values in groups:
+        names, label_values = ((label,), (label_value,)) if label else ((), ())
+        for key, value in values.items():
+            metric = _INVALID_NAME.sub("_", f"{name}_{key}")
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"{metric}{_labels(names, label_values)} {value}")
+            elif isinstance(value, str):
+                lines.append(f"{metric}_info{_labels(names + (key,), label_values + (value,))} 1")
+    return lines
+
+
+def exposition(extra: Sequence[str] = ()) -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task overhead) recording each
+    request under its route template. With a profiler, requests slower than
+    its threshold get their sampled stacks dumped.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+        self._routes: Dict[Any, str] = {}
+
+    def route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = next(
+                (r.path for r in scope["app"].routes if getattr(r, "endpoint", None) is endpoint), UNMATCHED_ROUTE
+            )
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            end = time.perf_counter()
+            route = self.route_template(scope)
+            request_seconds.observe(end - start, scope["method"], route, str(status))
+            if self.profiler is not None and end - start >= self.profiler.threshold:
+                await run_in_threadpool(self.profiler.dump, f"{scope['method']} {route}", start, end)
@@ -0,0 +1,119 @@
+"""
+Database migration script
+Run this after upgrading to add the columns and indexes that create_all
+won't add to existing tables, and to version scenarios stored before
+scenario versioning. Safe to run repeatedly.
+"""
+from sqlalchemy import exists, inspect, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+from database import engine, Base
+import models
+import scenario_store
+import sys
+
+
+def missing_columns(bind):
+    """Columns declared on the models but absent from tables that already exist"""
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                yield column
+
+
+def add_column(bind, column):
+    """Nullable ADD COLUMN, which is a catalog-only change on Postgres"""
+    with bind.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {column.table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+        ))
+
+
+def backfill_scenario_versions(bind, batch_size=1000):
+    """
+    Scenarios written before versioning become version 1 of their decision
+    (each decision had exactly one set then) and get their content hashes.
+    Returns the number of scenarios hashed.
+    """
+    member = models.ScenarioSetMember
+    scenario = models.Scenario
+    hashed = 0
+    with Session(bind) as db:
+        db.execute(insert(member).from_select(
+            ["decision_id", "version", "scenario_id", "rank", "created_at"],
+            select(scenario.decision_id, literal(1), scenario.id, scenario.rank, scenario.created_at).where(
+                ~exists().where(member.decision_id == scenario.decision_id)
+            )
+        ))
+        db.commit()
+        while True:
+            rows = db.query(scenario).filter(scenario.content_hash.is_(None)).limit(batch_size).all()
+            if not rows:
+                return hashed
+            db.execute(update(scenario), [
+                {
+                    "id": row.id,
+                    "content_hash": scenario_store.content_hash(
+                        {field: getattr(row, field) for field in scenario_store.CONTENT_FIELDS}
+                    )
+                }
+                for row in rows
+            ])
+            db.commit()
+            db.expunge_all()
+            hashed += len(rows)
+
+
+def missing_indexes(bind):
+    """Indexes declared on the models but absent from the database"""
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                yield index
+
+
+def create_index(bind, index):
+    if bind.dialect.name == "postgresql":
+        # CONCURRENTLY keeps the table writable while the index builds; it
+        # can't run inside a transaction, hence autocommit
+        columns = ", ".join(column.name for column in index.columns)
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table.name} ({columns})"
+            ))
+    else:
+        index.create(bind=bind, checkfirst=True)
+
+
+def migrate_database():
+    """Create tables that don't exist yet, then missing columns and indexes, then backfill"""
+    try:
+        Base.metadata.create_all(bind=engine)
+        columns = list(missing_columns(engine))
+        for column in columns:
+            print(f"Adding column {column.name} to {column.table.name}...")
+            add_column(engine, column)
+        pending = list(missing_indexes(engine))
+        for index in pending:
+            print(f"Creating index {index.name} on {index.table.name}...")
+            create_index(engine, index)
+        hashed = backfill_scenario_versions(engine)
+        if not (columns or pending or hashed):
+            print("✅ Database schema is up to date")
+            return True
+        print(f"✅ Added {len(columns)} column(s), {len(pending)} index(es); versioned {hashed} existing scenario(s)")
+        return True
+    except Exception as e:
+        print(f"❌ Error migrating database: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,131 @@
+"""
+Mock scenarios: the fallback when no LLM provider is configured, and the
+path load tests exercise.
+
+Skeletons for every base amount and horizon up to MAX_HORIZON are built once
+at import. A request only fills in the decision title and draws from its own
+RNG stream, seeded from LLM_MOCK_SEED (or an explicit seed) and the decision,
+so the same seed and decision always produce the same scenarios.
+"""
+import hashlib
+import random
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+
+# (title prefix, probability, description, financial multiplier, satisfaction, risk level)
+TEMPLATES = (
+    ("Optimistic Path", 0.65,
+     "Everything goes according to plan with minimal setbacks. You achieve your goals ahead of schedule.",
+     1.2, 8.5, "low"),
+    ("Balanced Approach", 0.75,
+     "A realistic middle-ground scenario with expected challenges and steady progress.",
+     1.0, 7.0, "medium"),
+    ("Conservative Path", 0.55,
+     "A cautious approach with slower progress but lower risk. Takes longer but more stable.",
+     0.8, 6.5, "low"),
+    ("Aggressive Strategy", 0.45,
+     "High-risk, high-reward approach. Potential for significant gains but also setbacks.",
+     1.5, 7.5, "high"),
+    ("Gradual Transition", 0.70,
+     "Step-by-step approach minimizing disruption. Slower but more manageable.",
+     0.9, 7.8, "low"),
+)
+BASE_AMOUNTS = {"career": 60000}
+DEFAULT_BASE_AMOUNT = 50000
+FINANCIAL_YEARS = (1, 3, 5)
+HOURS_RANGE = (300, 1000)
+MAX_HORIZON = 10
+
+
+def _timeline(horizon: int) -> Tuple[Dict[str, str], ...]:
+    events = []
+    for year in range(1, horizon + 1):
+        if year == 1:
+            event, impact = "Initial implementation and learning phase", "neutral"
+        elif year == horizon:
+            event, impact = "Full realization of outcomes", "positive"
+        else:
+            event, impact = "Continued progress and optimization", "positive"
+        events.append({"period": f"Year {year}", "event": event, "impact": impact})
+    return tuple(events)
+
+
+@lru_cache(maxsize=64)
+def skeletons(base_amount: int, horizon: int) -> Tuple[Dict[str, Any], ...]:
+    """Everything about each template's scenario except the title and the random draws"""
+    timeline = _timeline(horizon)
+    result = []
+    for prefix, probability, description, multiplier, satisfaction, risk_level in TEMPLATES:
+        result.append({
+            "prefix": prefix,
+            "probability": probability,
+            "description": description,
+            "timeline": timeline,
+            "financial": {
+                f"year_{year}": int(base_amount * multiplier * (1 + (year - 1) * 0.15))
+                for year in FINANCIAL_YEARS if year <= horizon
+            },
+            "satisfaction": satisfaction,
+            "risks": (
+                {
+                    "factor": "Market conditions may change",
+                    "severity": risk_level,
+                    "mitigation": "Stay informed and be ready to adapt"
+                },
+                {
+                    "factor": "Unexpected challenges may arise",
+                    "severity": "medium",
+                    "mitigation": "Build contingency plans and maintain flexibility"
+                },
+            ),
+            "recommendations": (
+                f"This path is suitable if you prioritize {'stability' if risk_level == 'low' else 'growth'}. "
+                "Consider your risk tolerance and timeline."
+            ),
+        })
+    return tuple(result)
+
+
+def derive_seed(seed: int, decision_title: str, category: str, num_scenarios: int, time_horizon: int) -> int:
+    """A stable 64-bit seed per (seed, decision); unlike hash(), it doesn't vary between processes"""
+    key = f"{seed}\0{decision_title}\0{category}\0{num_scenarios}\0{time_horizon}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+def generate(
+    decision_title: str,
+    category: str,
+    num_scenarios: int,
+    time_horizon: int,
+    seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Fresh scenario dicts (safe for callers to mutate) from the precomputed skeletons"""
+    base_amount = BASE_AMOUNTS.get(category, DEFAULT_BASE_AMOUNT)
+    rng = random.Random(derive_seed(
+        settings.LLM_MOCK_SEED if seed is None else seed, decision_title, category, num_scenarios, time_horizon
+    ))
+    scenarios = []
+    for rank, skeleton in enumerate(skeletons(base_amount, time_horizon)[:max(num_scenarios, 0)], start=1):
+        scenarios.append({
+            "title": f"{skeleton['prefix']}: {decision_title}",
+            "probability": skeleton["probability"],
+            "description": skeleton["description"],
+            "timeline": [dict(event) for event in skeleton["timeline"]],
+            "outcomes": {
+                "financial": dict(skeleton["financial"]),
+                "satisfaction": skeleton["satisfaction"],
+                "time_investment_hours": rng.randint(*HOURS_RANGE)
+            },
+            "risks": [dict(risk) for risk in skeleton["risks"]],
+            "recommendations": skeleton["recommendations"],
+            "rank": rank
+        })
+    return scenarios
+
+
+# Precompile every skeleton requests can ask for (the API allows horizons 1-10)
+for _base_amount in {DEFAULT_BASE_AMOUNT, *BASE_AMOUNTS.values()}:
+    for _horizon in range(1, MAX_HORIZON + 1):
+        skeletons(_base_amount, _horizon)
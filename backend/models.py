@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Float, JSON, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Float, JSON, Boolean, Index, func, select
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -33,12 +33,18 @@ class Decision(Base):
     category = Column(String(100))  # career, finance, health, business, education
     context = Column(JSON)  # Additional context data
     status = Column(String(50), default="draft")  # draft, simulating, completed, archived
+    scenario_version = Column(Integer)  # last scenario version number handed out (see scenario_store)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User", back_populates="decisions")
     scenarios = relationship("Scenario", back_populates="decision", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Per-user listing in keyset order (see GET /api/v1/decisions)
+        Index("ix_decisions_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
 
 class Scenario(Base):
     __tablename__ = "scenarios"
@@ -52,8 +58,40 @@ class Scenario(Base):
     outcomes = Column(JSON)  # Financial, satisfaction, risk metrics
     risks = Column(JSON)  # Risk factors
     recommendations = Column(Text)
-    rank = Column(Integer)  # Ranking based on optimization
+    rank = Column(Integer)  # Ranking based on optimization, in the latest version that includes it
+    content_hash = Column(String(64))  # payload digest; versions share rows with unchanged payloads
     created_at = Column(DateTime, default=datetime.utcnow)
     
     decision = relationship("Decision", back_populates="scenarios")
+    memberships = relationship("ScenarioSetMember", back_populates="scenario", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_scenarios_decision_id_rank", "decision_id", "rank"),
+        Index("ix_scenarios_decision_id_content_hash", "decision_id", "content_hash"),
+    )
+
+
+class ScenarioSetMember(Base):
+    """A scenario's place in one numbered simulation run (version) of a decision"""
+    __tablename__ = "scenario_set_members"
+    
+    decision_id = Column(String, ForeignKey("decisions.id"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    scenario_id = Column(String, ForeignKey("scenarios.id"), primary_key=True)
+    rank = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    scenario = relationship("Scenario", back_populates="memberships")
+
+    __table_args__ = (
+        # Latest-version reads: max(version), then that version's rows in rank order
+        Index("ix_scenario_set_members_decision_id_version_rank", "decision_id", "version", "rank"),
+    )
+
+    @classmethod
+    def latest(cls, decision_ids):
+        """Subquery of (decision_id, version) for each decision's newest version"""
+        return select(cls.decision_id, func.max(cls.version).label("version")).where(
+            cls.decision_id.in_(decision_ids)
+        ).group_by(cls.decision_id).subquery()
 
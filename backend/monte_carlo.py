@@ -0,0 +1,137 @@
+"""
+Vectorized Monte Carlo outcome engine.
+
+Turns each scenario's point estimates (outcomes.financial, probability, risk
+severities) into a distribution of yearly financial trajectories. All scenarios
+of a simulation are sampled together in one batched array of shape
+(scenarios, years, paths), so 100k paths x 10 years x 5 scenarios stays well
+under a second on one core.
+
+Model, per scenario and path:
+  - the expected path interpolates outcomes.financial ("year_N" keys) over
+    1..time_horizon_years
+  - yearly lognormal noise whose volatility widens as probability drops
+  - each risk may strike in any year with a severity-based hazard; a hit
+    permanently removes a severity-based share of the value
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BASE_VOLATILITY = 0.10
+# Extra volatility for an uncertain scenario: sigma * (1 + UNCERTAINTY_WEIGHT * (1 - probability))
+UNCERTAINTY_WEIGHT = 1.0
+RISK_HAZARD = {"low": 0.02, "medium": 0.05, "high": 0.10}
+RISK_LOSS = {"low": 0.05, "medium": 0.15, "high": 0.30}
+PERCENTILES = (10, 50, 90)
+
+
+def expected_path(financial: Dict[str, Any], years: int) -> Optional[np.ndarray]:
+    """Interpolate sparse {"year_N": value} outcomes onto 1..years"""
+    points = []
+    for key, value in (financial or {}).items():
+        try:
+            points.append((int(str(key).rsplit("_", 1)[-1]), float(value)))
+        except (TypeError, ValueError):
+            continue
+    if not points:
+        return None
+    points.sort()
+    xs, ys = zip(*points)
+    return np.interp(np.arange(1, years + 1), xs, ys)
+
+
+def normalize_probability(scenario: Dict[str, Any]) -> float:
+    try:
+        probability = float(scenario.get("probability", 0.5))
+    except (TypeError, ValueError):
+        return 0.5
+    # LLMs sometimes answer in percent
+    if probability > 1:
+        probability /= 100
+    return min(max(probability, 0.0), 1.0)
+
+
+def simulate_outcomes(
+    scenarios: List[Dict[str, Any]],
+    years: int,
+    num_paths: int = 10000,
+    seed: Optional[int] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Sample num_paths trajectories per scenario; returns one summary per scenario
+    (None where the scenario has no usable financial outcomes).
+    """
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(scenarios)
+    indices, means, sigmas, risk_rows = [], [], [], []
+
+    for i, scenario in enumerate(scenarios):
+        outcomes = scenario.get("outcomes")
+        path = expected_path(outcomes.get("financial") if isinstance(outcomes, dict) else None, years)
+        if path is None:
+            continue
+        indices.append(i)
+        means.append(path)
+        sigmas.append(BASE_VOLATILITY * (1 + UNCERTAINTY_WEIGHT * (1 - normalize_probability(scenario))))
+        severities = [
+            str(risk.get("severity", "medium")).lower()
+            for risk in (scenario.get("risks") or []) if isinstance(risk, dict)
+        ]
+        risk_rows.append([(RISK_HAZARD.get(s, RISK_HAZARD["medium"]), RISK_LOSS.get(s, RISK_LOSS["medium"]))
+                          for s in severities])
+
+    if not indices or num_paths <= 0:
+        return results
+
+    rng = np.random.default_rng(seed)
+    n_scenarios = len(indices)
+    # Paths on the last, contiguous axis: (scenarios, years, paths), float32 throughout
+    mean = np.asarray(means, dtype=np.float32)[:, :, None]              # (S, Y, 1)
+    sigma = np.asarray(sigmas, dtype=np.float32)[:, None, None]         # (S, 1, 1)
+    t = np.arange(1, years + 1)
+
+    # Mean-preserving lognormal drift: E[exp(cumsum(eps) - sigma^2 t / 2)] == 1
+    log_step = rng.standard_normal((n_scenarios, years, num_paths), dtype=np.float32) * sigma
+    log_step -= 0.5 * sigma ** 2
+
+    # Risks padded to a rectangle (zero hazard for missing entries); one draw per risk slot
+    max_risks = max((len(row) for row in risk_rows), default=0)
+    for r in range(max_risks):
+        hazard = np.zeros((n_scenarios, 1, 1), dtype=np.float32)
+        log_keep = np.zeros((n_scenarios, 1, 1), dtype=np.float32)
+        for s, row in enumerate(risk_rows):
+            if r < len(row):
+                hazard[s], log_keep[s] = row[r][0], np.log1p(-row[r][1])
+        hits = rng.random((n_scenarios, years, num_paths), dtype=np.float32) < hazard
+        log_step += hits * log_keep
+
+    values = mean * np.exp(np.cumsum(log_step, axis=1))                 # (S, Y, N)
+    bands = np.percentile(values, PERCENTILES, axis=2)                  # (P, S, Y)
+    expected = values.mean(axis=2, dtype=np.float64)                    # (S, Y)
+
+    for s, i in enumerate(indices):
+        expected_value = float(expected[s, -1])
+        results[i] = {
+            "paths": num_paths,
+            "years": t.tolist(),
+            **{f"p{p}": np.rint(bands[k, s]).astype(int).tolist() for k, p in enumerate(PERCENTILES)},
+            "expected": np.rint(expected[s]).astype(int).tolist(),
+            "expected_value": round(expected_value, 2),
+            "probability_weighted_value": round(expected_value * normalize_probability(scenarios[i]), 2),
+        }
+
+    return results
+
+
+def annotate_scenarios(
+    scenarios: List[Dict[str, Any]],
+    years: int,
+    num_paths: int = 10000,
+    seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Store each scenario's summary under outcomes["monte_carlo"], in place"""
+    for scenario, summary in zip(scenarios, simulate_outcomes(scenarios, years, num_paths, seed)):
+        if summary is not None:
+            scenario["outcomes"]["monte_carlo"] = summary
+    return scenarios
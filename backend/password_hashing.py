@@ -0,0 +1,95 @@
+"""
+Password hashing off the request path.
+
+bcrypt costs 100-300 ms of CPU per call while holding the GIL, so by default
+hashes run in a process pool sized to the cores (HASH_POOL=process). Work is
+admitted through a bounded slot count (workers + HASH_QUEUE_SIZE); when every
+slot is taken, HashingOverloaded is raised straight away instead of queueing
+without limit, and the API turns it into a 429.
+
+HASH_POOL=thread or inline keep the work in this process (tests, platforms
+without fork).
+"""
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import settings
+
+
+class HashingOverloaded(Exception):
+    """Every hashing slot is busy"""
+
+
+def build_context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# Worker-side context, built once per process
+_worker_context: Optional[CryptContext] = None
+
+
+def _context() -> CryptContext:
+    global _worker_context
+    if _worker_context is None:
+        _worker_context = build_context(settings.BCRYPT_ROUNDS)
+    return _worker_context
+
+
+def _hash(password: str) -> str:
+    return _context().hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash's scheme or cost is outdated"""
+    return _context().verify_and_update(password, hashed_password)
+
+
+class HashingPool:
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self._slots = threading.BoundedSemaphore(self.workers + max(queue_size, 0))
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+            return self._executor
+
+    def run(self, fn, *args):
+        """Run fn in the pool and wait for it; raises HashingOverloaded when saturated"""
+        if self.kind == "inline":
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+pool = HashingPool(settings.HASH_POOL, settings.HASH_WORKERS, settings.HASH_QUEUE_SIZE)
+
+
+def hash_password(password: str) -> str:
+    return pool.run(_hash, password)
+
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pool.run(_verify_and_update, password, hashed_password)
@@ -0,0 +1,120 @@
+"""
+Opt-in sampling profiler for slow requests (PROFILE_SLOW_REQUESTS_SECONDS > 0).
+
+A daemon thread snapshots every thread's Python stack each
+PROFILE_INTERVAL_SECONDS into a ring buffer covering PROFILE_WINDOW_SECONDS.
+When MetricsMiddleware sees a request slower than the threshold, the samples
+taken while it ran are written to PROFILE_DIR in collapsed-stack format
+("thread;outer;...;inner count"), which flamegraph.pl, speedscope and
+inferno read directly.
+
+Samples cover the whole process over the request's lifetime, so concurrent
+requests and background jobs show up too; the thread name is the root frame
+to help tell them apart. Threads parked in the event loop's select or an idle
+pool wait are skipped, so time awaiting I/O isn't attributed to stacks; the
+span histograms cover that.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, List, Optional, Tuple
+
+# (file basename, function) of the innermost frame of a thread with nothing to do
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its work queue
+}
+MAX_DEPTH = 128
+
+Stack = Tuple[int, Tuple]  # (thread ident, code objects outermost first)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, threshold: float, interval: float, window: float, output_dir: str, max_files: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._samples: Deque[Tuple[float, List[Stack]]] = deque(maxlen=max(int(window / interval), 1))
+        self._written: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                codes = []
+                while frame is not None and len(codes) < MAX_DEPTH:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                stacks.append((ident, tuple(codes)))
+            frame = None  # drop the last frame reference before sleeping
+            with self._lock:
+                self._samples.append((now, stacks))
+
+    def collapsed(self, start: float, end: float) -> Counter:
+        """Sample counts per collapsed stack for samples taken in [start, end]"""
+        with self._lock:
+            samples = [stacks for taken, stacks in self._samples if start <= taken <= end]
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        counts: Counter = Counter()
+        for stacks in samples:
+            for ident, codes in stacks:
+                frames = [names.get(ident, f"thread-{ident}")] + [_frame_label(code) for code in codes]
+                counts[";".join(frames)] += 1
+        return counts
+
+    def dump(self, label: str, start: float, end: float) -> Optional[str]:
+        """Write the request's samples to PROFILE_DIR, keeping the newest max_files dumps"""
+        counts = self.collapsed(start, end)
+        if not counts:
+            return None
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+        path = os.path.join(
+            self.output_dir, f"{time.strftime('%Y%m%dT%H%M%S')}_{slug}_{(end - start) * 1000:.0f}ms.collapsed"
+        )
+        with open(path, "w") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        with self._lock:
+            self._written.append(path)
+            expired = self._written.popleft() if len(self._written) > self.max_files else None
+        if expired:
+            try:
+                os.remove(expired)
+            except OSError:
+                pass
+        return path
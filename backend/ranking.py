@@ -0,0 +1,205 @@
+"""
+Multi-criteria scenario ranking.
+
+Scenarios are ranked by Pareto layer first (non-dominated sort over financial
+value, satisfaction, risk and probability), then by a weighted score within
+each layer. Everything works on padded (decisions, scenarios, criteria) arrays
+so re-ranking thousands of stored decisions is a handful of NumPy operations.
+
+A criterion with weight 0 is ignored entirely, including for dominance.
+"""
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, update
+from sqlalchemy.orm import Session
+
+import models
+from monte_carlo import normalize_probability
+
+CRITERIA = ("financial", "satisfaction", "risk", "probability")
+DEFAULT_WEIGHTS = {name: 1.0 for name in CRITERIA}
+SEVERITY_SCORE = {"low": 1.0, "medium": 2.0, "high": 3.0}
+RERANK_CHUNK_SIZE = 500
+
+
+def _number(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def financial_value(outcomes: Dict[str, Any]) -> float:
+    """Monte Carlo expected value when available, else the latest year_N estimate"""
+    monte_carlo = outcomes.get("monte_carlo")
+    if isinstance(monte_carlo, dict) and "expected_value" in monte_carlo:
+        return _number(monte_carlo["expected_value"])
+    financial = outcomes.get("financial")
+    if not isinstance(financial, dict) or not financial:
+        return 0.0
+    latest = max(financial, key=lambda key: _number(str(key).rsplit("_", 1)[-1], -1.0))
+    return _number(financial[latest])
+
+
+def scenario_features(
+    outcomes: Optional[Dict[str, Any]],
+    risks: Optional[List[Dict[str, Any]]],
+    probability: Any
+) -> List[float]:
+    """Criteria vector for one scenario, oriented so that higher is better"""
+    outcomes = outcomes if isinstance(outcomes, dict) else {}
+    severities = [
+        SEVERITY_SCORE.get(str(risk.get("severity", "medium")).lower(), SEVERITY_SCORE["medium"])
+        for risk in (risks or []) if isinstance(risk, dict)
+    ]
+    return [
+        financial_value(outcomes),
+        _number(outcomes.get("satisfaction")),
+        -sum(severities) / len(severities) if severities else 0.0,
+        normalize_probability({"probability": probability}),
+    ]
+
+
+def dominance(features: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    (D, S, S) Pareto dominance over (D, S, C) higher-is-better features:
+    [d, i, j] is True when scenario i dominates scenario j, both real
+    """
+    at_least = (features[:, :, None, :] >= features[:, None, :, :]).all(axis=-1)
+    # i is strictly better somewhere exactly when j is not at least as good everywhere
+    dominates = at_least & ~at_least.transpose(0, 2, 1)
+    return dominates & mask[:, :, None] & mask[:, None, :]
+
+
+def pareto_layers(features: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated sort. features is (D, S, C) with higher-is-better criteria,
+    mask (D, S) marks real scenarios. Returns (D, S) layers, 0 = Pareto front,
+    -1 for padding.
+    """
+    dominates = dominance(features, mask)
+
+    layers = np.full(mask.shape, -1, dtype=np.int64)
+    remaining = mask.copy()
+    layer = 0
+    while remaining.any():
+        dominated = (dominates & remaining[:, :, None]).any(axis=1)
+        front = remaining & ~dominated
+        layers[front] = layer
+        remaining &= ~front
+        layer += 1
+    return layers
+
+
+def weighted_scores(features: np.ndarray, mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Per-decision min-max normalized criteria combined with weights, in [0, 1]"""
+    big = np.finfo(np.float64).max
+    low = np.where(mask[:, :, None], features, big).min(axis=1, keepdims=True)
+    high = np.where(mask[:, :, None], features, -big).max(axis=1, keepdims=True)
+    spread = high - low
+    normalized = np.divide(features - low, spread, out=np.zeros_like(features), where=spread > 0)
+    total = weights.sum()
+    if total <= 0:
+        return np.zeros(mask.shape)
+    return (normalized * weights).sum(axis=-1) / total
+
+
+def rank_batch(features: np.ndarray, mask: np.ndarray, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """1-based ranks (D, S) ordered by Pareto layer, then weighted score; 0 for padding"""
+    weight_vector = np.array([(weights or DEFAULT_WEIGHTS).get(name, 0.0) for name in CRITERIA], dtype=np.float64)
+    active = weight_vector > 0
+    if not active.any():
+        active[:] = True
+        weight_vector[:] = 1.0
+
+    features = features[:, :, active]
+    weight_vector = weight_vector[active]
+
+    layers = pareto_layers(features, mask)
+    scores = weighted_scores(features, mask, weight_vector)
+    # Scores are in [0, 1], so layer * 2 + (1 - score) orders by layer, then score
+    keys = np.where(mask, layers * 2.0 + (1.0 - scores), np.inf)
+    order = np.argsort(keys, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, order.shape[1] + 1)[None, :], axis=1)
+    return np.where(mask, ranks, 0)
+
+
+def pack(groups: Sequence[Sequence[List[float]]]):
+    """Pad per-decision feature lists into (D, S, C) features and (D, S) mask"""
+    width = max((len(group) for group in groups), default=0)
+    features = np.zeros((len(groups), width, len(CRITERIA)))
+    mask = np.zeros((len(groups), width), dtype=bool)
+    for d, group in enumerate(groups):
+        if group:
+            features[d, :len(group)] = group
+            mask[d, :len(group)] = True
+    return features, mask
+
+
+def rank_scenarios(scenarios: List[Dict[str, Any]], weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Set scenario['rank'] in place for freshly generated scenario dicts"""
+    if not scenarios:
+        return scenarios
+    features, mask = pack([[
+        scenario_features(s.get("outcomes"), s.get("risks"), s.get("probability", 0.5)) for s in scenarios
+    ]])
+    for scenario, rank in zip(scenarios, rank_batch(features, mask, weights)[0]):
+        scenario["rank"] = int(rank)
+    return scenarios
+
+
+def rerank_decisions(
+    db: Session,
+    decision_ids: Sequence[str],
+    weights: Optional[Dict[str, float]] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Recompute and store ranks for the latest scenario version of many decisions,
+    reading only the columns ranking needs. Returns {decision_id: {scenario_id: rank}};
+    the caller commits.
+    """
+    result: Dict[str, Dict[str, int]] = {}
+    decision_ids = list(dict.fromkeys(decision_ids))
+
+    for offset in range(0, len(decision_ids), RERANK_CHUNK_SIZE):
+        chunk = decision_ids[offset:offset + RERANK_CHUNK_SIZE]
+        member = models.ScenarioSetMember
+        latest = member.latest(chunk)
+        rows = db.query(
+            models.Scenario.id,
+            member.decision_id,
+            member.version,
+            models.Scenario.outcomes,
+            models.Scenario.risks,
+            models.Scenario.probability
+        ).join(
+            member, member.scenario_id == models.Scenario.id
+        ).join(
+            latest, and_(latest.c.decision_id == member.decision_id, latest.c.version == member.version)
+        ).order_by(member.decision_id, member.rank).all()
+
+        groups = [list(group) for _, group in groupby(rows, key=lambda row: row.decision_id)]
+        if not groups:
+            continue
+
+        features, mask = pack([
+            [scenario_features(row.outcomes, row.risks, row.probability) for row in group] for group in groups
+        ])
+        ranks = rank_batch(features, mask, weights)
+
+        updates, member_updates = [], []
+        for d, group in enumerate(groups):
+            decision_ranks = result.setdefault(group[0].decision_id, {})
+            for s, row in enumerate(group):
+                decision_ranks[row.id] = int(ranks[d, s])
+                updates.append({"id": row.id, "rank": int(ranks[d, s])})
+                member_updates.append({
+                    "decision_id": row.decision_id, "version": row.version, "scenario_id": row.id, "rank": int(ranks[d, s])
+                })
+        db.execute(update(models.Scenario), updates)
+        db.execute(update(member), member_updates)
+
+    return result
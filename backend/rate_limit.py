@@ -0,0 +1,37 @@
+"""
+Token-per-minute budget for provider calls.
+
+A token bucket holding up to a minute's worth of tokens and refilling
+continuously. Callers reserve their estimated usage before calling the
+provider and wait, in arrival order, while the bucket is short.
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.wait_seconds_total = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: int) -> None:
+        """Wait until `amount` tokens are available and take them; requests above capacity take a full bucket"""
+        amount = min(float(amount), self.capacity)
+        start = time.monotonic()
+        # Holding the lock while sleeping keeps waiters in FIFO order
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+        self.wait_seconds_total += time.monotonic() - start
@@ -0,0 +1,79 @@
+"""
+Shared async Redis client for REDIS_URL.
+
+REDIS_URL=memory:// swaps in LocalRedis, an in-process stand-in implementing the
+handful of commands the job queue and caches use, so tests need no server.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+
+class LocalRedis:
+    """In-memory stand-in for the few redis.asyncio commands we use"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lists: Dict[str, List[str]] = {}
+        self._pushed = asyncio.Condition()
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._values.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if nx and await self.get(key) is not None:
+            return None
+        expires_at = time.monotonic() + ex if ex else None
+        self._values[key] = (value, expires_at)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._values.pop(key, None) is not None)
+
+    async def lpush(self, key: str, *values: str) -> int:
+        async with self._pushed:
+            items = self._lists.setdefault(key, [])
+            for value in values:
+                items.insert(0, value)
+            self._pushed.notify_all()
+            return len(items)
+
+    async def brpop(self, keys, timeout: float = 0):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        async with self._pushed:
+            while True:
+                for key in keys:
+                    if self._lists.get(key):
+                        return key, self._lists[key].pop()
+                try:
+                    await asyncio.wait_for(self._pushed.wait(), timeout or None)
+                except asyncio.TimeoutError:
+                    return None
+
+
+def create_redis_client(url: str):
+    """redis.asyncio client for url, or the local stand-in for memory://"""
+    if url.startswith("memory://"):
+        return LocalRedis()
+    import redis.asyncio as redis
+    return redis.from_url(url, decode_responses=True)
+
+
+_client = None
+
+
+def get_redis():
+    """Process-wide client for settings.REDIS_URL, created on first use"""
+    global _client
+    if _client is None:
+        _client = create_redis_client(settings.REDIS_URL)
+    return _client
@@ -1,19 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from typing import List, Dict, Any, AsyncIterator, Iterator, Literal, Optional, Union
+from datetime import datetime
+import anyio
+import json
 import models
 import schemas
 import auth
-from database import get_db
+from config import settings
+from database import SessionLocal, get_db
+from fast_json import FastJSONResponse, encode_row, encode_rows
+from metrics import span
 import ai_service
+import export
+import jobs
+import monte_carlo
+import pagination
+import ranking
+import scenario_store
+import similarity_index
 
-router = APIRouter(prefix="/api/v1/decisions", tags=["Decisions"])
+# Endpoints returning FastJSONResponse directly skip FastAPI's response_model passes (see fast_json)
+router = APIRouter(prefix="/api/v1/decisions", tags=["Decisions"], default_response_class=FastJSONResponse)
+
+# ?fields=summary drops the unbounded JSON/Text columns from both the SELECT and the response
+Fields = Literal["full", "summary"]
+
+
+def summary_columns(model, schema):
+    """load_only() over exactly the columns a summary schema serializes"""
+    return load_only(*[getattr(model, name) for name in schema.model_fields])
+
+
+def decision_with_scenarios(decision: models.Decision, scenarios: List[models.Scenario], fields: Fields = "full"):
+    if fields == "summary":
+        decision_schema, scenario_schema = schemas.DecisionSummary, schemas.ScenarioSummary
+    else:
+        decision_schema, scenario_schema = schemas.DecisionResponse, schemas.ScenarioResponse
+    return FastJSONResponse({
+        "decision": encode_row(decision, decision_schema),
+        "scenarios": encode_rows(scenarios, scenario_schema)
+    })
 
 
 @router.post("", response_model=schemas.DecisionResponse, status_code=status.HTTP_201_CREATED)
 def create_decision(
     decision: schemas.DecisionCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new decision"""
@@ -28,34 +64,279 @@ def create_decision(
     db.add(db_decision)
     db.commit()
     db.refresh(db_decision)
+    similarity_index.index_decision(db_decision)
     
     return db_decision
 
 
-@router.get("", response_model=List[schemas.DecisionResponse])
+@router.get("", response_model=Union[schemas.DecisionPage, schemas.DecisionSummaryPage])
 def get_decisions(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: models.User = Depends(auth.get_current_user),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Fields = "full",
+    current_user: auth.Principal = Depends(auth.get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Get decisions for current user, oldest first; pass next_cursor back to get the next page"""
+    
+    query = db.query(models.Decision).filter(models.Decision.user_id == current_user.id)
+    if fields == "summary":
+        query = query.options(summary_columns(models.Decision, schemas.DecisionSummary))
+    decisions, next_cursor = pagination.keyset_page(query, models.Decision, limit, cursor)
+    
+    return FastJSONResponse({
+        "items": encode_rows(decisions, schemas.DecisionSummary if fields == "summary" else schemas.DecisionResponse),
+        "next_cursor": next_cursor
+    })
+
+
+def _export_stream(user_id: str, file_format: str, versions: str) -> Iterator[bytes]:
+    """Runs in Starlette's threadpool with its own session, held until the last chunk is sent"""
+    db = SessionLocal()
+    try:
+        yield from export.encode(export.export_rows(db, user_id, versions), file_format)
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_decisions(
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    versions: Literal["latest", "all"] = "latest",
+    current_user: auth.Principal = Depends(auth.get_current_principal)
+):
+    """Stream all of the user's decisions with their scenarios, one flat row per scenario"""
+    
+    if format == "parquet" and export.pyarrow is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export is not available on this server"
+        )
+    
+    media_type, extension = export.FORMATS[format]
+    filename = f"decisions-{datetime.utcnow():%Y%m%d}.{extension}"
+    return StreamingResponse(
+        _export_stream(current_user.id, format, versions),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/rank:batch", response_model=schemas.RankBatchResponse)
+def rerank_decisions(
+    rank_request: schemas.RankBatchRequest,
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-rank stored scenarios for many decisions with new weights, without calling the LLM"""
+    
+    query = db.query(models.Decision.id).filter(models.Decision.user_id == current_user.id)
+    if rank_request.decision_ids is not None:
+        query = query.filter(models.Decision.id.in_(rank_request.decision_ids))
+    decision_ids = [row.id for row in query]
+    
+    ranks = ranking.rerank_decisions(db, decision_ids, rank_request.weights.model_dump())
+    db.commit()
+    
+    return {
+        "decisions": len(ranks),
+        "scenarios": sum(len(decision_ranks) for decision_ranks in ranks.values())
+    }
+
+
+@router.post(
+    "/simulate:batch",
+    response_model=schemas.JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+def simulate_decisions(
+    batch_request: schemas.SimulationBatchRequest,
+    current_user: auth.Principal = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all decisions for current user"""
+    """Queue scenario generation for many decisions as one job; poll /api/v1/jobs/{id} for per-decision progress"""
+    
+    decision_ids = list(dict.fromkeys(batch_request.decision_ids))
+    if len(decision_ids) > settings.BATCH_MAX_DECISIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_DECISIONS} decisions per batch"
+        )
     
     decisions = db.query(models.Decision).filter(
+        models.Decision.id.in_(decision_ids),
         models.Decision.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).all()
+    found = {decision.id for decision in decisions}
     
-    return decisions
+    job = jobs.new_batch_simulation_job(
+        current_user.id,
+        decisions,
+        missing_ids=[decision_id for decision_id in decision_ids if decision_id not in found],
+        num_scenarios=batch_request.num_scenarios,
+        time_horizon_years=batch_request.time_horizon_years,
+        force_refresh=batch_request.force_refresh,
+        num_paths=batch_request.num_paths,
+        ranking_weights=batch_request.ranking_weights.model_dump() if batch_request.ranking_weights else None
+    )
+    
+    # Give the connection back before queueing, which writes the statuses through its own session
+    db.close()
+    
+    # Each decision is claimed as POST /{id}/simulate claims it; ones already
+    # being simulated come back joined to that job, or failed if it differs
+    try:
+        job = jobs.submit_batch_simulation(job)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Could not queue simulation: {str(e)}"
+        )
+    
+    return job
 
 
-@router.get("/{decision_id}", response_model=schemas.DecisionWithScenariosResponse)
+@router.get(
+    "/{decision_id}",
+    response_model=Union[schemas.DecisionWithScenariosResponse, schemas.DecisionWithScenarioSummariesResponse]
+)
 def get_decision(
     decision_id: str,
-    current_user: models.User = Depends(auth.get_current_user),
+    fields: Fields = "full",
+    current_user: auth.Principal = Depends(auth.get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get a specific decision with its scenarios"""
     
+    decision_query = db.query(models.Decision).filter(
+        models.Decision.id == decision_id,
+        models.Decision.user_id == current_user.id
+    )
+    scenario_query = scenario_store.latest_scenarios_query(db, decision_id)
+    if fields == "summary":
+        decision_query = decision_query.options(summary_columns(models.Decision, schemas.DecisionSummary))
+        scenario_query = scenario_query.options(summary_columns(models.Scenario, schemas.ScenarioSummary))
+    
+    decision = decision_query.first()
+    
+    if not decision:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Decision not found"
+        )
+    
+    return decision_with_scenarios(decision, scenario_query.all(), fields)
+
+
+@router.get("/{decision_id}/scenarios/{scenario_id}", response_model=schemas.ScenarioResponse)
+def get_scenario(
+    decision_id: str,
+    scenario_id: str,
+    current_user: auth.Principal = Depends(auth.get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Full payload (timeline, outcomes, risks, text) of one scenario, for use with fields=summary"""
+    
+    scenario = db.query(models.Scenario).join(models.Decision).filter(
+        models.Scenario.id == scenario_id,
+        models.Scenario.decision_id == decision_id,
+        models.Decision.user_id == current_user.id
+    ).first()
+    
+    if not scenario:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scenario not found"
+        )
+    
+    return FastJSONResponse(encode_row(scenario, schemas.ScenarioResponse))
+
+
+def _owned_decision_or_404(db: Session, decision_id: str, user_id: str) -> None:
+    owned = db.query(models.Decision.id).filter(
+        models.Decision.id == decision_id,
+        models.Decision.user_id == user_id
+    ).first()
+    if not owned:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Decision not found"
+        )
+
+
+@router.get("/{decision_id}/versions", response_model=schemas.ScenarioVersionList)
+def list_scenario_versions(
+    decision_id: str,
+    current_user: auth.Principal = Depends(auth.get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Stored simulation runs of a decision, newest first"""
+
+    _owned_decision_or_404(db, decision_id, current_user.id)
+
+    member = models.ScenarioSetMember
+    versions = db.query(
+        member.version,
+        func.count().label("scenarios"),
+        func.min(member.created_at).label("created_at")
+    ).filter(
+        member.decision_id == decision_id
+    ).group_by(member.version).order_by(member.version.desc()).all()
+
+    return {"decision_id": decision_id, "versions": [version._asdict() for version in versions]}
+
+
+@router.get("/{decision_id}/versions/diff", response_model=schemas.ScenarioVersionDiff)
+def diff_scenario_versions(
+    decision_id: str,
+    base: Optional[int] = Query(None, ge=1),
+    head: Optional[int] = Query(None, ge=1),
+    current_user: auth.Principal = Depends(auth.get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Compare two simulation runs; by default the latest against the one before it"""
+
+    _owned_decision_or_404(db, decision_id, current_user.id)
+
+    member = models.ScenarioSetMember
+    versions = [
+        version for version, in db.query(member.version).filter(
+            member.decision_id == decision_id
+        ).distinct().order_by(member.version.desc())
+    ]
+    if head is None and versions:
+        head = versions[0]
+    if base is None and head is not None:
+        base = next((version for version in versions if version < head), None)
+    if head not in versions or base not in versions:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Version not found" if versions else "Decision has no simulation runs"
+        )
+
+    rows = db.query(models.Scenario, member.version, member.rank).join(
+        member, member.scenario_id == models.Scenario.id
+    ).filter(
+        member.decision_id == decision_id,
+        member.version.in_([base, head])
+    ).order_by(member.rank).all()
+
+    diff = scenario_store.diff_versions(
+        [(scenario, rank) for scenario, version, rank in rows if version == base],
+        [(scenario, rank) for scenario, version, rank in rows if version == head]
+    )
+    return {"decision_id": decision_id, "base": base, "head": head, **diff}
+
+
+@router.post("/{decision_id}/rank", response_model=schemas.DecisionWithScenariosResponse)
+def rerank_decision(
+    decision_id: str,
+    weights: schemas.RankingWeights,
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-rank a decision's stored scenarios with new weights, without calling the LLM"""
+    
     decision = db.query(models.Decision).filter(
         models.Decision.id == decision_id,
         models.Decision.user_id == current_user.id
@@ -67,21 +348,19 @@ def get_decision(
             detail="Decision not found"
         )
     
-    scenarios = db.query(models.Scenario).filter(
-        models.Scenario.decision_id == decision_id
-    ).order_by(models.Scenario.rank).all()
+    ranking.rerank_decisions(db, [decision_id], weights.model_dump())
+    db.commit()
     
-    return {
-        "decision": decision,
-        "scenarios": scenarios
-    }
+    scenarios = scenario_store.latest_scenarios_query(db, decision_id).all()
+    
+    return decision_with_scenarios(decision, scenarios)
 
 
 @router.put("/{decision_id}", response_model=schemas.DecisionResponse)
 def update_decision(
     decision_id: str,
     decision_update: schemas.DecisionUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update a decision"""
@@ -104,6 +383,7 @@ def update_decision(
     
     db.commit()
     db.refresh(db_decision)
+    similarity_index.index_decision(db_decision)
     
     return db_decision
 
@@ -111,7 +391,7 @@ def update_decision(
 @router.delete("/{decision_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_decision(
     decision_id: str,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a decision"""
@@ -129,18 +409,118 @@ def delete_decision(
     
     db.delete(db_decision)
     db.commit()
+    similarity_index.remove_decision(decision_id)
     
     return None
 
 
-@router.post("/{decision_id}/simulate", response_model=schemas.DecisionWithScenariosResponse)
+@router.post(
+    "/{decision_id}/simulate",
+    response_model=schemas.JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
 def simulate_decision(
     decision_id: str,
     simulation_request: schemas.SimulationRequest,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queue AI-powered scenario generation for a decision; poll /api/v1/jobs/{id} for the result"""
+    
+    with span("simulate.load_decision"):
+        decision = db.query(models.Decision).filter(
+            models.Decision.id == decision_id,
+            models.Decision.user_id == current_user.id
+        ).first()
+    
+    if not decision:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Decision not found"
+        )
+    
+    job = jobs.new_simulation_job(
+        decision,
+        num_scenarios=simulation_request.num_scenarios,
+        time_horizon_years=simulation_request.time_horizon_years,
+        force_refresh=simulation_request.force_refresh,
+        num_paths=simulation_request.num_paths,
+        ranking_weights=simulation_request.ranking_weights.model_dump() if simulation_request.ranking_weights else None
+    )
+    
+    # Give the connection back before queueing, which writes the status through its own session
+    db.close()
+    
+    # One simulation per decision at a time: an identical one already in flight
+    # is returned instead of starting another (this also marks the decision simulating)
+    try:
+        with span("simulate.enqueue"):
+            job, _ = jobs.submit_simulation(job)
+    except jobs.SimulationConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Could not queue simulation: {str(e)}"
+        )
+    
+    return job
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _scenario_events(
+    stream_job: Dict[str, Any],
+    version: int,
+    params: Dict[str, Any],
+    num_paths: int,
+    ranking_weights: Optional[Dict[str, float]] = None
+) -> AsyncIterator[str]:
+    """Persist and push each scenario as soon as the parser completes it, then release the decision's claim"""
+    
+    decision_id = stream_job["decision_id"]
+    count = 0
+    completed = False
+    try:
+        async for scenario_data in ai_service.stream_scenarios(**params):
+            if num_paths:
+                await run_in_threadpool(
+                    monte_carlo.annotate_scenarios, [scenario_data], params["time_horizon_years"], num_paths
+                )
+            scenario = await run_in_threadpool(scenario_store.add_scenario, decision_id, version, scenario_data)
+            count += 1
+            yield _sse("scenario", schemas.ScenarioResponse.model_validate(scenario).model_dump_json())
+        
+        # Scenarios stream in arrival order; rank the full set once it is complete
+        ranks = await run_in_threadpool(scenario_store.complete_version, decision_id, version, ranking_weights)
+        completed = True
+        yield _sse("done", json.dumps({"decision_id": decision_id, "version": version, "count": count, "ranks": ranks}))
+    
+    except Exception as e:
+        yield _sse("error", json.dumps({"detail": f"Error generating scenarios: {str(e)}"}))
+    
+    finally:
+        # Also reached on client disconnect (GeneratorExit, or cancellation
+        # mid-await), so shield the writes from that cancellation
+        with anyio.CancelScope(shield=True):
+            if not completed:
+                await run_in_threadpool(scenario_store.settle_version, decision_id, version, count, ranking_weights)
+            await jobs.release_stream(stream_job)
+
+
+@router.post("/{decision_id}/simulate/stream")
+def simulate_decision_stream(
+    decision_id: str,
+    simulation_request: schemas.SimulationRequest,
+    current_user: auth.Principal = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate AI-powered scenarios for a decision"""
+    """Stream AI-generated scenarios as Server-Sent Events, persisting each as it arrives"""
     
     decision = db.query(models.Decision).filter(
         models.Decision.id == decision_id,
@@ -153,61 +533,45 @@ def simulate_decision(
             detail="Decision not found"
         )
     
-    # Update decision status
-    decision.status = "simulating"
-    db.commit()
+    params = jobs.simulation_params(
+        decision,
+        num_scenarios=simulation_request.num_scenarios,
+        time_horizon_years=simulation_request.time_horizon_years,
+        force_refresh=simulation_request.force_refresh
+    )
     
+    # Streams hold the decision's single-flight claim too, and never share it
+    stream_job = jobs.new_stream_job(decision)
     try:
-        # Generate scenarios using AI
-        scenarios_data = ai_service.generate_scenarios(
-            decision_title=decision.title,
-            decision_description=decision.description or "",
-            category=decision.category,
-            context=decision.context or {},
-            num_scenarios=simulation_request.num_scenarios,
-            time_horizon_years=simulation_request.time_horizon_years
+        jobs.claim_stream(stream_job)
+    except jobs.SimulationConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
         )
-        
-        # Delete existing scenarios
-        db.query(models.Scenario).filter(
-            models.Scenario.decision_id == decision_id
-        ).delete()
-        
-        # Create new scenarios
-        db_scenarios = []
-        for scenario_data in scenarios_data:
-            db_scenario = models.Scenario(
-                decision_id=decision_id,
-                title=scenario_data.get("title", "Untitled Scenario"),
-                description=scenario_data.get("description", ""),
-                probability=scenario_data.get("probability", 0.5),
-                timeline_data=scenario_data.get("timeline", []),
-                outcomes=scenario_data.get("outcomes", {}),
-                risks=scenario_data.get("risks", []),
-                recommendations=scenario_data.get("recommendations", ""),
-                rank=scenario_data.get("rank", 1)
-            )
-            db.add(db_scenario)
-            db_scenarios.append(db_scenario)
-        
-        # Update decision status
-        decision.status = "completed"
-        db.commit()
-        
-        # Refresh scenarios
-        for scenario in db_scenarios:
-            db.refresh(scenario)
-        
-        return {
-            "decision": decision,
-            "scenarios": db_scenarios
-        }
-    
     except Exception as e:
-        decision.status = "draft"
-        db.commit()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating scenarios: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Could not start simulation: {str(e)}"
         )
-
+    
+    # Scenarios join the next version one by one as the stream completes them
+    try:
+        version = scenario_store.reserve_version(db, decision_id)
+        decision.status = "simulating"
+        db.commit()
+    except Exception:
+        anyio.from_thread.run(jobs.release_stream, stream_job)
+        raise
+    
+    return StreamingResponse(
+        _scenario_events(
+            stream_job,
+            version,
+            params,
+            simulation_request.num_paths,
+            simulation_request.ranking_weights.model_dump() if simulation_request.ranking_weights else None
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
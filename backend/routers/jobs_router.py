@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+import schemas
+import auth
+import jobs
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: auth.Principal = Depends(auth.get_current_principal)
+):
+    """Get the status of a background job"""
+    
+    job = await jobs.backend.get(job_id)
+    
+    if not job or job.get("user_id") != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+import models
+import schemas
+import auth
+from config import settings
+from database import get_db
+from fast_json import FastJSONResponse
+from metrics import span
+import comparison
+
+router = APIRouter(prefix="/api/v1/scenarios", tags=["Scenarios"], default_response_class=FastJSONResponse)
+
+
+@router.post("/{scenario_id}/compare", response_model=schemas.ScenarioComparison)
+def compare_scenarios(
+    scenario_id: str,
+    compare_request: schemas.ScenarioCompareRequest,
+    current_user: auth.Principal = Depends(auth.get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Compare stored scenarios, from any of the user's decisions, against this one"""
+
+    scenario_ids = list(dict.fromkeys([scenario_id, *compare_request.scenario_ids]))
+    if len(scenario_ids) > settings.COMPARE_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.COMPARE_MAX_SCENARIOS} scenarios per comparison"
+        )
+
+    # Only the columns the comparison reads
+    rows = db.query(
+        models.Scenario.id,
+        models.Scenario.decision_id,
+        models.Scenario.title,
+        models.Scenario.probability,
+        models.Scenario.outcomes,
+        models.Scenario.risks
+    ).join(models.Decision).filter(
+        models.Scenario.id.in_(scenario_ids),
+        models.Decision.user_id == current_user.id
+    ).all()
+
+    if len(rows) < len(scenario_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scenario not found"
+        )
+
+    by_id = {row.id: row for row in rows}
+    scenarios = [by_id[scenario_id] for scenario_id in scenario_ids]
+    with span("scenarios.compare"):
+        result = comparison.compare(scenarios, baseline=0, years=compare_request.years)
+
+    return FastJSONResponse({
+        "baseline_id": scenario_id,
+        "scenarios": [
+            {"id": row.id, "decision_id": row.decision_id, "title": row.title} for row in scenarios
+        ],
+        **result
+    })
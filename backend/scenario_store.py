@@ -0,0 +1,385 @@
+"""
+Scenario persistence shared by the job workers and the streaming endpoint.
+
+Each simulation run is stored as the decision's next numbered version: one
+scenario_set_members row per scenario, carrying its rank in that run.
+Numbers come from a counter on the decision row (see version_counter), so
+runs writing at the same time never share one.
+Scenario rows are content-addressed per decision. A scenario whose payload
+(see content_hash) matches one the decision already has is reused rather
+than rewritten; its rank column follows the newest version that includes
+it. A run that mostly repeats the last one therefore writes only member
+rows. Versions beyond SCENARIO_VERSIONS_KEPT are pruned along with the
+scenarios only they referenced.
+
+Each helper opens its own short-lived session so callers never hold a DB
+connection across an LLM call.
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, exists, func, insert, or_, select, update
+from sqlalchemy.orm import Query, Session
+
+import models
+import ranking
+from config import settings
+from database import SessionLocal
+
+# Payload columns versions can share; rank is per version
+CONTENT_FIELDS = ("title", "description", "probability", "timeline_data", "outcomes", "risks", "recommendations")
+
+
+def comparable(field: str, value: Any) -> Any:
+    """
+    A payload column as compared across versions. Monte Carlo summaries count
+    by their configuration (paths, years), not their sampled values, so a
+    re-run of an unchanged scenario matches the stored one.
+    """
+    if field == "outcomes" and isinstance(value, dict) and isinstance(value.get("monte_carlo"), dict):
+        summary = value["monte_carlo"]
+        return {**value, "monte_carlo": {"paths": summary.get("paths"), "years": summary.get("years")}}
+    return value
+
+
+def content_hash(values: Dict[str, Any]) -> str:
+    """sha256 of the payload columns (see comparable)"""
+    payload = {field: comparable(field, values.get(field)) for field in CONTENT_FIELDS}
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def scenario_values(decision_id: str, scenario_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for one generated scenario"""
+    values = {
+        "decision_id": decision_id,
+        "title": scenario_data.get("title", "Untitled Scenario"),
+        "description": scenario_data.get("description", ""),
+        "probability": scenario_data.get("probability", 0.5),
+        "timeline_data": scenario_data.get("timeline", []),
+        "outcomes": scenario_data.get("outcomes", {}),
+        "risks": scenario_data.get("risks", []),
+        "recommendations": scenario_data.get("recommendations", ""),
+        "rank": scenario_data.get("rank", 1),
+    }
+    values["content_hash"] = content_hash(values)
+    return values
+
+
+def insert_scenarios(db: Session, values: List[Dict[str, Any]]) -> List[models.Scenario]:
+    """One INSERT ... RETURNING for all rows, returned in parameter order"""
+    if not values:
+        return []
+    return db.scalars(
+        insert(models.Scenario).returning(models.Scenario, sort_by_parameter_order=True),
+        values
+    ).all()
+
+
+def version_scenarios_query(db: Session, decision_id: str, version) -> Query:
+    """Scenarios of one version in rank order; `version` may be a scalar subquery"""
+    member = models.ScenarioSetMember
+    return db.query(models.Scenario).join(
+        member, member.scenario_id == models.Scenario.id
+    ).filter(
+        member.decision_id == decision_id,
+        member.version == version
+    ).order_by(member.rank)
+
+
+def latest_scenarios_query(db: Session, decision_id: str) -> Query:
+    """The newest version's scenarios; both steps use ix_scenario_set_members_decision_id_version_rank"""
+    member = models.ScenarioSetMember
+    latest = select(func.max(member.version)).where(member.decision_id == decision_id).scalar_subquery()
+    return version_scenarios_query(db, decision_id, latest)
+
+
+def diff_versions(
+    base: List[Tuple[models.Scenario, Optional[int]]],
+    head: List[Tuple[models.Scenario, Optional[int]]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compare two versions given as (scenario, rank in that version) pairs.
+    Scenarios with the same payload are unchanged (usually the same row);
+    of the rest, ones sharing a title are changed, and the others added or removed.
+    """
+    def entry(scenario, rank):
+        return {"id": scenario.id, "title": scenario.title, "probability": scenario.probability, "rank": rank}
+
+    result: Dict[str, List[Dict[str, Any]]] = {"added": [], "removed": [], "changed": [], "unchanged": []}
+    removed = list(base)
+    for scenario, rank in head:
+        match = next((i for i, (old, _) in enumerate(removed) if old.id == scenario.id), None)
+        if match is None:
+            match = next(
+                (i for i, (old, _) in enumerate(removed) if old.content_hash == scenario.content_hash), None
+            )
+        if match is not None:
+            old, old_rank = removed.pop(match)
+            result["unchanged"].append({
+                "id": scenario.id, "title": scenario.title, "base_rank": old_rank, "head_rank": rank
+            })
+            continue
+        match = next((i for i, (old, _) in enumerate(removed) if old.title == scenario.title), None)
+        if match is None:
+            result["added"].append(entry(scenario, rank))
+            continue
+        old, old_rank = removed.pop(match)
+        result["changed"].append({
+            "title": scenario.title,
+            "base": entry(old, old_rank),
+            "head": entry(scenario, rank),
+            "fields": [
+                field for field in CONTENT_FIELDS
+                if comparable(field, getattr(old, field)) != comparable(field, getattr(scenario, field))
+            ],
+        })
+    result["removed"] = [entry(scenario, rank) for scenario, rank in removed]
+    return result
+
+
+def _stored_matches(db: Session, values: List[Dict[str, Any]]) -> Dict[Tuple[str, str], List[Any]]:
+    """Stored rows with the new payloads' hashes, as {(decision_id, content_hash): [row, ...]}"""
+    hashes: Dict[str, set] = {}
+    for value in values:
+        hashes.setdefault(value["decision_id"], set()).add(value["content_hash"])
+    if not hashes:
+        return {}
+    rows = db.execute(
+        select(models.Scenario.id, models.Scenario.decision_id, models.Scenario.content_hash, models.Scenario.rank)
+        .where(or_(*[
+            and_(models.Scenario.decision_id == decision_id, models.Scenario.content_hash.in_(decision_hashes))
+            for decision_id, decision_hashes in hashes.items()
+        ]))
+    ).all()
+    matches: Dict[Tuple[str, str], List[Any]] = {}
+    for row in rows:
+        matches.setdefault((row.decision_id, row.content_hash), []).append(row)
+    return matches
+
+
+def prune_versions(db: Session, versions: Dict[str, int]) -> None:
+    """
+    Drop versions older than the newest SCENARIO_VERSIONS_KEPT, given each
+    decision's newest version, and the scenarios no remaining version uses.
+    """
+    keep = settings.SCENARIO_VERSIONS_KEPT
+    member = models.ScenarioSetMember
+    expired = [
+        and_(member.decision_id == decision_id, member.version <= version - keep)
+        for decision_id, version in versions.items() if keep > 0 and version > keep
+    ]
+    if not expired:
+        return
+    released = set(db.scalars(
+        delete(member).where(or_(*expired)).returning(member.scenario_id),
+        execution_options={"synchronize_session": False}
+    ).all())
+    if released:
+        db.execute(
+            delete(models.Scenario).where(
+                models.Scenario.id.in_(released),
+                ~exists().where(member.scenario_id == models.Scenario.id)
+            ),
+            execution_options={"synchronize_session": False}
+        )
+
+
+def version_counter():
+    """
+    SET expression for a decision's next version number. Reading and bumping
+    it in one UPDATE makes the assignment atomic: the row stays locked until
+    commit, so concurrent runs never share a number. Decisions versioned
+    before the counter existed continue from their newest stored version.
+    """
+    member = models.ScenarioSetMember
+    newest = select(func.max(member.version)).where(member.decision_id == models.Decision.id).scalar_subquery()
+    return func.coalesce(models.Decision.scenario_version, newest, 0) + 1
+
+
+def bulk_add_versions(
+    db: Session,
+    scenarios_by_decision: Dict[str, List[Dict[str, Any]]],
+    status: str = "completed"
+) -> Dict[str, List[str]]:
+    """
+    Store each decision's scenarios as its next version in the caller's
+    transaction, in a fixed number of statements however many rows. Returns
+    {decision_id: scenario ids in input order}; decisions that no longer exist
+    are skipped. The caller commits.
+    """
+    decision_ids = list(scenarios_by_decision)
+    if not decision_ids:
+        return {}
+
+    new_versions = dict(db.execute(
+        update(models.Decision)
+        .where(models.Decision.id.in_(decision_ids))
+        .values(status=status, updated_at=datetime.utcnow(), scenario_version=version_counter())
+        .returning(models.Decision.id, models.Decision.scenario_version)
+    ).all())
+    existing = set(new_versions)
+
+    values = [
+        scenario_values(decision_id, data)
+        for decision_id in decision_ids if decision_id in existing
+        for data in scenarios_by_decision[decision_id]
+    ]
+    matches = _stored_matches(db, values)
+
+    # Unchanged payloads keep their row (and id); each stored row is used once per version
+    slots, new_values, rank_updates = [], [], []
+    for value in values:
+        stored = matches.get((value["decision_id"], value["content_hash"]))
+        row = stored.pop() if stored else None
+        if row is None:
+            new_values.append(value)
+        elif row.rank != value["rank"]:
+            rank_updates.append({"id": row.id, "rank": value["rank"]})
+        slots.append((value, row.id if row is not None else None))
+
+    inserted = iter(insert_scenarios(db, new_values))
+    result: Dict[str, List[str]] = {decision_id: [] for decision_id in existing}
+    members = []
+    for value, scenario_id in slots:
+        if scenario_id is None:
+            scenario_id = next(inserted).id
+        result[value["decision_id"]].append(scenario_id)
+        members.append({
+            "decision_id": value["decision_id"],
+            "version": new_versions[value["decision_id"]],
+            "scenario_id": scenario_id,
+            "rank": value["rank"],
+        })
+    if rank_updates:
+        db.execute(update(models.Scenario), rank_updates)
+    if members:
+        db.execute(insert(models.ScenarioSetMember), members)
+    prune_versions(db, new_versions)
+    return result
+
+
+def add_versions(scenarios_by_decision: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[str]]:
+    """
+    Store new versions for many decisions in one transaction and mark them
+    completed. Returns {decision_id: scenario_ids} for decisions that still exist.
+    """
+    db = SessionLocal()
+    try:
+        scenario_ids = bulk_add_versions(db, scenarios_by_decision)
+        db.commit()
+        return scenario_ids
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def add_version(decision_id: str, scenarios_data: List[Dict[str, Any]]) -> List[str]:
+    """Store a decision's scenarios as its next version and mark it completed"""
+    added = add_versions({decision_id: scenarios_data})
+    if decision_id not in added:
+        raise ValueError("Decision no longer exists")
+    return added[decision_id]
+
+
+def reserve_version(db: Session, decision_id: str) -> Optional[int]:
+    """Hand out the decision's next version number (None if it doesn't exist); the caller commits"""
+    return db.scalar(
+        update(models.Decision)
+        .where(models.Decision.id == decision_id)
+        .values(scenario_version=version_counter())
+        .returning(models.Decision.scenario_version),
+        execution_options={"synchronize_session": False}
+    )
+
+
+def add_scenario(decision_id: str, version: int, scenario_data: Dict[str, Any]) -> models.Scenario:
+    """Add one scenario to a version being streamed and return it detached"""
+    db = SessionLocal()
+    try:
+        value = scenario_values(decision_id, scenario_data)
+        member = models.ScenarioSetMember
+        scenario = db.scalars(
+            select(models.Scenario).where(
+                models.Scenario.decision_id == decision_id,
+                models.Scenario.content_hash == value["content_hash"],
+                ~exists().where(
+                    member.scenario_id == models.Scenario.id,
+                    member.decision_id == decision_id,
+                    member.version == version
+                )
+            ).limit(1)
+        ).first()
+        if scenario is None:
+            scenario, = insert_scenarios(db, [value])
+        else:
+            scenario.rank = value["rank"]
+        db.add(member(decision_id=decision_id, version=version, scenario_id=scenario.id, rank=value["rank"]))
+        db.flush()
+        # Detach before commit so the values aren't expired and re-selected
+        db.expunge(scenario)
+        db.commit()
+        return scenario
+    finally:
+        db.close()
+
+
+def complete_version(
+    decision_id: str,
+    version: int,
+    weights: Optional[Dict[str, float]] = None
+) -> Dict[str, int]:
+    """Rank a streamed version, prune old ones and mark the decision completed; returns {scenario_id: rank}"""
+    db = SessionLocal()
+    try:
+        ranks = ranking.rerank_decisions(db, [decision_id], weights)
+        prune_versions(db, {decision_id: version})
+        db.query(models.Decision).filter(
+            models.Decision.id == decision_id
+        ).update({"status": "completed"}, synchronize_session=False)
+        db.commit()
+        return ranks.get(decision_id, {})
+    finally:
+        db.close()
+
+
+def settle_version(
+    decision_id: str,
+    version: int,
+    count: int,
+    weights: Optional[Dict[str, float]] = None
+) -> None:
+    """
+    Close out a streamed version that stopped early: the scenarios already
+    sent are kept and ranked as a complete version, and with none sent the
+    decision goes back to draft. Never fails.
+    """
+    try:
+        if count:
+            complete_version(decision_id, version, weights)
+            return
+    except Exception as e:
+        print(f"Error completing partial version {version} of decision {decision_id}: {e}")
+    set_decision_status(decision_id, "draft")
+
+
+def set_decision_status(decision_id: str, status: str) -> None:
+    set_decisions_status([decision_id], status)
+
+
+def set_decisions_status(decision_ids: List[str], status: str) -> None:
+    if not decision_ids:
+        return
+    db = SessionLocal()
+    try:
+        db.query(models.Decision).filter(
+            models.Decision.id.in_(decision_ids)
+        ).update({"status": status}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
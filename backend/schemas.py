@@ -79,6 +79,30 @@ class DecisionResponse(BaseModel):
         from_attributes = True
 
 
+class DecisionSummary(BaseModel):
+    """DecisionResponse without the unbounded description/context columns"""
+    id: str
+    user_id: str
+    title: str
+    category: str
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class DecisionPage(BaseModel):
+    items: List[DecisionResponse]
+    next_cursor: Optional[str] = None  # opaque; pass back as ?cursor= for the next page
+
+
+class DecisionSummaryPage(BaseModel):
+    items: List[DecisionSummary]
+    next_cursor: Optional[str] = None
+
+
 # Scenario Schemas
 class ScenarioResponse(BaseModel):
     id: str
@@ -86,7 +110,7 @@ class ScenarioResponse(BaseModel):
     title: str
     description: Optional[str]
     probability: Optional[float]
-    timeline_data: Optional[Dict[str, Any]]
+    timeline_data: Optional[List[Dict[str, Any]]]
     outcomes: Optional[Dict[str, Any]]
     risks: Optional[List[Dict[str, Any]]]
     recommendations: Optional[str]
@@ -97,14 +121,159 @@ class ScenarioResponse(BaseModel):
         from_attributes = True
 
 
+class ScenarioSummary(BaseModel):
+    """ScenarioResponse without the JSON and Text payloads; fetch those per scenario"""
+    id: str
+    decision_id: str
+    title: str
+    probability: Optional[float]
+    rank: Optional[int]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class DecisionWithScenariosResponse(BaseModel):
     decision: DecisionResponse
     scenarios: List[ScenarioResponse]
 
 
+class DecisionWithScenarioSummariesResponse(BaseModel):
+    decision: DecisionSummary
+    scenarios: List[ScenarioSummary]
+
+
+# Scenario versions (one per simulation run)
+class ScenarioVersion(BaseModel):
+    version: int
+    scenarios: int
+    created_at: datetime
+
+
+class ScenarioVersionList(BaseModel):
+    decision_id: str
+    versions: List[ScenarioVersion]  # newest first
+
+
+class ScenarioVersionEntry(BaseModel):
+    """A scenario as ranked in one version"""
+    id: str
+    title: str
+    probability: Optional[float]
+    rank: Optional[int]
+
+
+class ScenarioUnchanged(BaseModel):
+    id: str
+    title: str
+    base_rank: Optional[int]
+    head_rank: Optional[int]
+
+
+class ScenarioChange(BaseModel):
+    """A title present in both versions with a different payload"""
+    title: str
+    base: ScenarioVersionEntry
+    head: ScenarioVersionEntry
+    fields: List[str]  # payload columns that differ
+
+
+class ScenarioVersionDiff(BaseModel):
+    decision_id: str
+    base: int
+    head: int
+    added: List[ScenarioVersionEntry]
+    removed: List[ScenarioVersionEntry]
+    changed: List[ScenarioChange]
+    unchanged: List[ScenarioUnchanged]
+
+
+# Ranking
+class RankingWeights(BaseModel):
+    financial: float = Field(default=1.0, ge=0)
+    satisfaction: float = Field(default=1.0, ge=0)
+    risk: float = Field(default=1.0, ge=0)
+    probability: float = Field(default=1.0, ge=0)
+
+
+class RankBatchRequest(BaseModel):
+    decision_ids: Optional[List[str]] = None  # defaults to all of the user's decisions
+    weights: RankingWeights = RankingWeights()
+
+
+class RankBatchResponse(BaseModel):
+    decisions: int
+    scenarios: int
+
+
+# Scenario comparison
+class ScenarioCompareRequest(BaseModel):
+    scenario_ids: List[str] = Field(min_length=1)  # compared against the scenario in the path
+    years: Optional[int] = Field(default=None, ge=1, le=50)  # defaults to the furthest year given
+
+
+class ComparedScenario(BaseModel):
+    id: str
+    decision_id: str
+    title: str
+
+
+class ScenarioComparison(BaseModel):
+    """Per-scenario lists and matrix rows follow `scenarios`, baseline first"""
+    baseline_id: str
+    scenarios: List[ComparedScenario]
+    years: List[int]
+    value: List[Optional[float]]
+    satisfaction: List[Optional[float]]
+    risk: List[Optional[float]]  # mean severity, 1 (low) to 3 (high); 0 without risks
+    probability: List[Optional[float]]
+    risk_adjusted_value: List[Optional[float]]
+    break_even_year: List[Optional[int]]
+    break_even_vs_baseline: List[Optional[int]]
+    pareto_front: List[bool]
+    financial: List[List[Optional[float]]]  # scenarios x years
+    delta: List[List[Optional[float]]]  # financial minus the baseline's
+    dominance: List[List[int]]  # [i][j]: 1 if i dominates j, -1 if j dominates i, else 0
+
+
 # Simulation Request
 class SimulationRequest(BaseModel):
     decision_id: str
     num_scenarios: int = Field(default=3, ge=2, le=5)
     time_horizon_years: int = Field(default=5, ge=1, le=10)
+    force_refresh: bool = False  # bypass the LLM response cache
+    num_paths: int = Field(default=10000, ge=0, le=200000)  # Monte Carlo paths per scenario; 0 disables
+    ranking_weights: Optional[RankingWeights] = None
+
 
+class SimulationBatchRequest(BaseModel):
+    decision_ids: List[str] = Field(min_length=1)
+    num_scenarios: int = Field(default=3, ge=2, le=5)
+    time_horizon_years: int = Field(default=5, ge=1, le=10)
+    force_refresh: bool = False
+    num_paths: int = Field(default=10000, ge=0, le=200000)
+    ranking_weights: Optional[RankingWeights] = None
+
+
+# Job Schemas
+class JobItem(BaseModel):
+    decision_id: str
+    status: str  # queued, completed, failed, joined
+    job_id: Optional[str] = None  # joined: the job already simulating this decision
+    scenario_ids: List[str] = []
+    error: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued, running, completed, partial (batch only), failed
+    decision_id: Optional[str] = None
+    scenario_ids: List[str] = []
+    items: List[JobItem] = []  # per-decision results of simulate_batch jobs
+    progress: Optional[Dict[str, int]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
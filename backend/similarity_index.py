@@ -0,0 +1,488 @@
+"""
+Near-duplicate decision index, so near-identical decisions reuse scenarios
+instead of calling the LLM provider again.
+
+Each decision's title, description and context become a set of words and
+word pairs (lowercased, stopwords dropped, plurals folded). The set is
+summarised by a 64-permutation MinHash signature. Two signatures agree in a
+position with probability equal to the Jaccard similarity of the sets.
+
+Signatures are cut into 16 bands of 4 (LSH). Any decision sharing a band
+with the query is a candidate; the band keys live in one sorted numpy
+array, so a lookup is a single searchsorted. Candidates are then scored
+against the low 16 bits of their stored minhashes. At J=0.7 a decision
+shares a band with probability ~0.99; at J=0.3, ~0.12.
+
+A lookup is a signature plus a handful of numpy calls: at a million
+decisions, ~0.1 ms, or ~0.3 ms when hundreds of near-copies share buckets
+(benchmarks/bench_similarity.py). Memory is ~330 bytes of arrays per
+decision plus its id, about 0.5 KB all told.
+
+Only decisions in the same group are considered: same category and, with
+SIMILARITY_SCOPE=user, same user. A reused scenario can quote the source
+decision's description, so "global" shares that text across users.
+
+The index is per process:
+  - rebuilt from the database in the background at startup
+  - kept current by the decision endpoints
+  - fed by the workers, which add decisions as they finish simulating, so a
+    decision created in another process still becomes a source once it has
+    scenarios here
+Updated and deleted decisions leave dead rows behind until the next rebuild.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config import settings
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_BUCKET_SCAN = 1000  # rows read per band key; bounds lookups on hot duplicates
+MERGE_MIN = 1024  # decisions added one at a time before their keys are merged into the sorted arrays
+MERGE_FRACTION = 0.05  # ...or this share of the index, so a merge's O(n) copy is amortised
+MAX_SOURCES = 5  # near-duplicates whose scenarios are tried, best first
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hashing: h_k(x) = high 32 bits of (a_k * x + b_k) mod 2^64, a_k odd
+_A = _rng.integers(1, 1 << 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+_MIX = _rng.integers(1, 1 << 63, ROWS, dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.integers(0, 1 << 63, BANDS, dtype=np.uint64)
+
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a about after all also am an and any are as at be been before but by can could do does for from "
+    "had has have how i if in into is it its just me more my not now of on or our over should so some "
+    "than that the their them then there these they this to up us was we what when where whether which "
+    "while who why will with would you your".split()
+)
+
+
+@lru_cache(maxsize=65536)
+def _fold(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def shingles(title: str, description: Optional[str], context: Optional[Dict[str, Any]]) -> Set[str]:
+    """Words and adjacent word pairs of the decision's text, context keys and values included"""
+    parts = [title or "", description or ""]
+    for key, value in (context or {}).items():
+        parts.append(str(key))
+        parts.append(value if isinstance(value, str) else json.dumps(value, default=str))
+    words = [_fold(word) for word in _WORD.findall(" ".join(parts).lower()) if word not in STOPWORDS]
+    return set(words).union(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+
+def _hash_tokens(tokens: Iterable[str]) -> np.ndarray:
+    # str hashes are salted per process, as is the index, so they only need to agree within one
+    return np.fromiter(map(hash, tokens), dtype=np.int64).view(np.uint64)
+
+
+def signature(tokens: Set[str]) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERM uint32), None for an empty set"""
+    if not tokens:
+        return None
+    hashes = _hash_tokens(tokens)
+    permuted = (np.outer(_A, hashes) + _B[:, None]) >> _SHIFT
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def signatures(token_sets: Sequence[Set[str]]) -> np.ndarray:
+    """Signatures of many non-empty sets at once, shape (len(token_sets), NUM_PERM)"""
+    lengths = np.fromiter((len(tokens) for tokens in token_sets), dtype=np.int64, count=len(token_sets))
+    hashes = _hash_tokens(token for tokens in token_sets for token in tokens)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    permuted = (np.outer(_A, hashes) + _B[:, None]) >> _SHIFT
+    return np.minimum.reduceat(permuted, starts, axis=1).T.astype(np.uint32)
+
+
+@lru_cache(maxsize=4096)
+def group_salt(group: str) -> int:
+    return int.from_bytes(hashlib.blake2b(group.encode(), digest_size=8).digest(), "little")
+
+
+def band_keys(sigs: np.ndarray, salts: np.ndarray) -> np.ndarray:
+    """
+    One uint64 per band per signature, shape (n, BANDS). Each signature's group
+    salt is mixed in, so keys of different groups don't collide.
+    """
+    bands = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    return (bands * _MIX).sum(axis=2) ^ _BAND_SALT ^ salts[:, None]
+
+
+def decision_group(user_id: Optional[str], category: Optional[str]) -> str:
+    owner = user_id if settings.SIMILARITY_SCOPE == "user" else "*"
+    return f"{owner}\x00{category or ''}"
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._ids: List[Optional[str]] = []  # row -> decision id, None once replaced or removed
+        self._rows_by_id: Dict[str, int] = {}
+        self._groups: Dict[str, int] = {}
+        self._row_group = np.empty(0, dtype=np.int32)
+        self._minhash16 = np.empty((0, NUM_PERM), dtype=np.uint16)
+        # Sorted band keys and their rows, plus keys added since the last merge
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._key_rows = np.empty(0, dtype=np.int32)
+        self._pending: Dict[int, List[int]] = {}
+        self._merging: Dict[int, List[int]] = {}
+        self._pending_rows = 0
+        self.stats = {"ready": False, "decisions": 0, "lookups": 0, "hits": 0, "reused": 0, "rebuild_seconds": 0.0}
+
+    def __len__(self) -> int:
+        return len(self._rows_by_id)
+
+    def _append(self, ids: Sequence[str], groups: Sequence[str], sigs: np.ndarray,
+                replace: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Add rows for decisions (caller holds the lock) and return their band keys
+        and rows, flattened. Without replace, ids already indexed are left alone.
+        """
+        keep = [i for i, decision_id in enumerate(ids) if replace or decision_id not in self._rows_by_id]
+        start = len(self._ids)
+        count = len(keep)
+        if start + count > len(self._row_group):
+            capacity = max(2 * len(self._row_group), start + count, 1024)
+            self._row_group = np.resize(self._row_group, capacity)
+            minhash16 = np.empty((capacity, NUM_PERM), dtype=np.uint16)
+            minhash16[:start] = self._minhash16[:start]
+            self._minhash16 = minhash16
+        sigs = sigs[keep]
+        self._minhash16[start:start + count] = sigs.astype(np.uint16)
+        for offset, i in enumerate(keep):
+            decision_id = ids[i]
+            previous = self._rows_by_id.get(decision_id)
+            if previous is not None:
+                self._ids[previous] = None
+            self._rows_by_id[decision_id] = start + offset
+            self._ids.append(decision_id)
+            self._row_group[start + offset] = self._groups.setdefault(groups[i], len(self._groups))
+        self.stats["decisions"] = len(self._rows_by_id)
+        salts = np.fromiter((group_salt(groups[i]) for i in keep), dtype=np.uint64, count=count)
+        keys = band_keys(sigs, salts).ravel()
+        rows = np.repeat(np.arange(start, start + count, dtype=np.int32), BANDS)
+        return keys, rows
+
+    def _merge(self, extra_keys: Optional[np.ndarray] = None, extra_rows: Optional[np.ndarray] = None) -> None:
+        """
+        Fold pending keys (and extra_keys/extra_rows) into the sorted arrays. The
+        O(n) insert runs outside the lock; lookups keep reading the old arrays
+        plus the keys being merged.
+        """
+        with self._merge_lock:
+            with self._lock:
+                self._merging, self._pending = self._pending, {}
+                self._pending_rows = 0
+                keys, key_rows, merging = self._keys, self._key_rows, self._merging
+            new_keys = [np.fromiter((key for key, rows in merging.items() for _ in rows), dtype=np.uint64)]
+            new_rows = [np.fromiter((row for rows in merging.values() for row in rows), dtype=np.int32)]
+            if extra_keys is not None:
+                new_keys.append(extra_keys)
+                new_rows.append(extra_rows)
+            new_keys, new_rows = np.concatenate(new_keys), np.concatenate(new_rows)
+            order = np.argsort(new_keys, kind="stable")
+            new_keys, new_rows = new_keys[order], new_rows[order]
+            positions = np.searchsorted(keys, new_keys)
+            merged_keys = np.insert(keys, positions, new_keys)
+            merged_rows = np.insert(key_rows, positions, new_rows)
+            with self._lock:
+                self._keys, self._key_rows = merged_keys, merged_rows
+                self._merging = {}
+
+    def add(self, decision_id: str, user_id: Optional[str], category: Optional[str],
+            title: str, description: Optional[str], context: Optional[Dict[str, Any]]) -> None:
+        """Index a decision, replacing its previous text"""
+        sig = signature(shingles(title, description, context))
+        if sig is None:
+            self.remove(decision_id)
+            return
+        with self._lock:
+            keys, rows = self._append([decision_id], [decision_group(user_id, category)], sig[None, :], True)
+            for key, row in zip(keys.tolist(), rows.tolist()):
+                self._pending.setdefault(key, []).append(row)
+            self._pending_rows += 1
+            merge = self._pending_rows >= max(MERGE_MIN, MERGE_FRACTION * len(self._ids))
+        if merge:
+            self._merge()
+
+    def add_many(self, decisions: Iterable[Tuple[str, Optional[str], Optional[str], str, Optional[str], Any]],
+                 replace: bool = False, chunk_size: int = 5000) -> None:
+        """
+        Bulk add (id, user_id, category, title, description, context) tuples,
+        sorting their band keys in once at the end. Until then they aren't found.
+        """
+        all_keys, all_rows = [], []
+
+        def flush(chunk):
+            ids, groups, token_sets = [], [], []
+            for decision_id, user_id, category, title, description, context in chunk:
+                tokens = shingles(title, description, context)
+                if tokens:
+                    ids.append(decision_id)
+                    groups.append(decision_group(user_id, category))
+                    token_sets.append(tokens)
+            if ids:
+                sigs = signatures(token_sets)
+                with self._lock:
+                    keys, rows = self._append(ids, groups, sigs, replace)
+                all_keys.append(keys)
+                all_rows.append(rows)
+
+        chunk = []
+        for decision in decisions:
+            chunk.append(decision)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+        if all_keys:
+            self._merge(np.concatenate(all_keys), np.concatenate(all_rows))
+
+    def remove(self, decision_id: str) -> None:
+        with self._lock:
+            row = self._rows_by_id.pop(decision_id, None)
+            if row is not None:
+                self._ids[row] = None
+                self.stats["decisions"] = len(self._rows_by_id)
+
+    def similar(self, user_id: Optional[str], category: Optional[str], title: str,
+                description: Optional[str], context: Optional[Dict[str, Any]],
+                threshold: Optional[float] = None, exclude: Sequence[str] = (),
+                limit: int = MAX_SOURCES) -> List[Tuple[str, float]]:
+        """(decision_id, estimated Jaccard similarity) of the closest decisions in the group, best first"""
+        self.stats["lookups"] += 1
+        sig = signature(shingles(title, description, context))
+        if sig is None:
+            return []
+        group = decision_group(user_id, category)
+        keys = band_keys(sig[None, :], np.array([group_salt(group)], dtype=np.uint64))[0]
+        threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+        with self._lock:
+            group_id = self._groups.get(group)
+            if group_id is None:
+                return []
+            lo = np.searchsorted(self._keys, keys, "left")
+            hi = np.minimum(np.searchsorted(self._keys, keys, "right"), lo + MAX_BUCKET_SCAN)
+            found = [self._key_rows[start:end] for start, end in zip(lo.tolist(), hi.tolist()) if end > start]
+            for key in keys.tolist():
+                for pending in (self._pending, self._merging):
+                    rows = pending.get(key)
+                    if rows:
+                        found.append(np.asarray(rows[:MAX_BUCKET_SCAN], dtype=np.int32))
+            if not found:
+                return []
+            rows = np.unique(np.concatenate(found))
+            rows = rows[self._row_group[rows] == group_id]
+            scores = (self._minhash16[rows] == sig.astype(np.uint16)).mean(axis=1)
+            ids = self._ids
+            matches = [
+                (ids[row], score) for row, score in zip(rows.tolist(), scores.tolist())
+                if score >= threshold and ids[row] is not None and ids[row] not in exclude
+            ]
+        matches.sort(key=lambda match: -match[1])
+        if matches:
+            self.stats["hits"] += 1
+        return matches[:limit]
+
+    def rebuild(self, chunk_size: int = 5000) -> None:
+        """
+        Load every decision from the database. Decisions indexed by the endpoints
+        meanwhile are newer than what this reads, so they're kept.
+        """
+        import models
+        from database import SessionLocal
+
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            query = db.query(
+                models.Decision.id, models.Decision.user_id, models.Decision.category,
+                models.Decision.title, models.Decision.description, models.Decision.context
+            ).execution_options(yield_per=chunk_size)
+            self.add_many((tuple(row) for row in query), chunk_size=chunk_size)
+        finally:
+            db.close()
+        self.stats["ready"] = True
+        self.stats["rebuild_seconds"] = round(time.perf_counter() - started, 3)
+
+
+index = SimilarityIndex()
+
+
+def start_rebuild() -> Optional[threading.Thread]:
+    """Fill the index in a background thread so startup doesn't wait on it"""
+    if not settings.SIMILARITY_ENABLED:
+        return None
+
+    def run():
+        try:
+            index.rebuild()
+        except Exception as e:
+            print(f"Similarity index rebuild failed: {e}")
+
+    thread = threading.Thread(target=run, name="similarity-rebuild", daemon=True)
+    thread.start()
+    return thread
+
+
+def index_decision(decision) -> None:
+    """Index or re-index a decision row after it was created or updated"""
+    if settings.SIMILARITY_ENABLED:
+        index.add(decision.id, decision.user_id, decision.category,
+                  decision.title, decision.description, decision.context)
+
+
+def index_params(decision_id: str, user_id: str, params: Dict[str, Any]) -> None:
+    """Index a decision from a job's generation parameters (see jobs.simulation_params)"""
+    if settings.SIMILARITY_ENABLED:
+        index.add(decision_id, user_id, params["category"],
+                  params["decision_title"], params["decision_description"], params["context"])
+
+
+def remove_decision(decision_id: str) -> None:
+    if settings.SIMILARITY_ENABLED:
+        index.remove(decision_id)
+
+
+def similar_decisions(
+    user_id: Optional[str],
+    category: Optional[str],
+    title: str,
+    description: Optional[str],
+    context: Optional[Dict[str, Any]],
+    exclude: Sequence[str] = ()
+) -> List[Tuple[str, float]]:
+    if not settings.SIMILARITY_ENABLED:
+        return []
+    return index.similar(user_id, category, title, description, context, exclude=exclude)
+
+
+_YEAR = re.compile(r"^year[ _](\d+)$", re.IGNORECASE)
+_MONTH = re.compile(r"^month[ _](\d+)$", re.IGNORECASE)
+
+
+def _period_years(period: Any) -> Optional[float]:
+    text = str(period).strip()
+    match = _YEAR.match(text)
+    if match:
+        return int(match.group(1))
+    match = _MONTH.match(text)
+    if match:
+        return int(match.group(1)) / 12
+    return None
+
+
+def scenario_horizon(scenario: Dict[str, Any]) -> float:
+    """Furthest year a stored scenario covers, from its timeline periods and financial year_N keys"""
+    years = [_period_years(event.get("period")) for event in scenario.get("timeline") or [] if isinstance(event, dict)]
+    financial = (scenario.get("outcomes") or {}).get("financial") or {}
+    years += [_period_years(key) for key in financial]
+    return max((year for year in years if year is not None), default=0)
+
+
+def adapt_scenario(scenario: Dict[str, Any], source_title: str, title: str, time_horizon_years: int) -> Dict[str, Any]:
+    """
+    Another decision's scenario retitled for this one and cut to its horizon.
+    Monte Carlo summaries are dropped; the job recomputes them when asked to.
+    """
+    pattern = re.compile(re.escape(source_title), re.IGNORECASE) if source_title else None
+
+    def retitle(text: Any) -> Any:
+        return pattern.sub(lambda _: title, text) if pattern and isinstance(text, str) else text
+
+    outcomes = {key: value for key, value in (scenario.get("outcomes") or {}).items() if key != "monte_carlo"}
+    if isinstance(outcomes.get("financial"), dict):
+        outcomes["financial"] = {
+            key: value for key, value in outcomes["financial"].items()
+            if (_period_years(key) or 0) <= time_horizon_years
+        }
+    return {
+        "title": retitle(scenario.get("title")),
+        "probability": scenario.get("probability"),
+        "description": retitle(scenario.get("description")),
+        "timeline": [
+            {key: retitle(value) for key, value in event.items()}
+            for event in scenario.get("timeline") or []
+            if isinstance(event, dict) and (_period_years(event.get("period")) or 0) <= time_horizon_years
+        ],
+        "outcomes": outcomes,
+        "risks": [dict(risk) if isinstance(risk, dict) else risk for risk in scenario.get("risks") or []],
+        "recommendations": retitle(scenario.get("recommendations")),
+    }
+
+
+def reuse_scenarios(
+    candidates: List[Tuple[str, float]],
+    title: str,
+    num_scenarios: int,
+    time_horizon_years: int
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Adapted scenarios of the most similar completed candidate that has at
+    least num_scenarios of them covering the horizon, or None. Any error
+    (this is only a shortcut) also gives None.
+    """
+    from sqlalchemy import and_
+
+    import models
+    from database import SessionLocal
+
+    try:
+        db = SessionLocal()
+        try:
+            member = models.ScenarioSetMember
+            latest = member.latest([decision_id for decision_id, _ in candidates])
+            rows = db.query(models.Scenario, models.Decision.title).join(
+                member, member.scenario_id == models.Scenario.id
+            ).join(
+                latest, and_(latest.c.decision_id == member.decision_id, latest.c.version == member.version)
+            ).join(
+                models.Decision, models.Decision.id == member.decision_id
+            ).filter(
+                models.Decision.status == "completed"
+            ).order_by(member.rank).all()
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Similar decision lookup failed: {e}")
+        return None
+
+    by_decision: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+    for scenario, source_title in rows:
+        by_decision.setdefault(scenario.decision_id, (source_title, []))[1].append({
+            "title": scenario.title,
+            "probability": scenario.probability,
+            "description": scenario.description,
+            "timeline": scenario.timeline_data,
+            "outcomes": scenario.outcomes,
+            "risks": scenario.risks,
+            "recommendations": scenario.recommendations,
+        })
+    for decision_id, _ in candidates:
+        source_title, scenarios = by_decision.get(decision_id, ("", []))
+        if len(scenarios) < num_scenarios:
+            continue
+        if any(scenario_horizon(scenario) < time_horizon_years for scenario in scenarios[:num_scenarios]):
+            continue
+        index.stats["reused"] += 1
+        return [
+            adapt_scenario(scenario, source_title, title, time_horizon_years)
+            for scenario in scenarios[:num_scenarios]
+        ]
+    return None
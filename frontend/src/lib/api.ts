@@ -62,13 +62,29 @@ export const decisionsAPI = {
     return response.data;
   },
 
+  getPage: async (cursor?: string, limit = 100, fields: 'full' | 'summary' = 'full') => {
+    const response = await api.get('/api/v1/decisions', { params: { cursor, limit, fields } });
+    return response.data as { items: any[]; next_cursor: string | null };
+  },
+
   getAll: async () => {
-    const response = await api.get('/api/v1/decisions');
+    const decisions: any[] = [];
+    let cursor: string | undefined;
+    do {
+      const page = await decisionsAPI.getPage(cursor);
+      decisions.push(...page.items);
+      cursor = page.next_cursor ?? undefined;
+    } while (cursor);
+    return decisions;
+  },
+
+  getById: async (id: string, fields: 'full' | 'summary' = 'full') => {
+    const response = await api.get(`/api/v1/decisions/${id}`, { params: { fields } });
     return response.data;
   },
 
-  getById: async (id: string) => {
-    const response = await api.get(`/api/v1/decisions/${id}`);
+  getScenario: async (decisionId: string, scenarioId: string) => {
+    const response = await api.get(`/api/v1/decisions/${decisionId}/scenarios/${scenarioId}`);
     return response.data;
   },
 
@@ -87,8 +103,34 @@ export const decisionsAPI = {
       num_scenarios: numScenarios,
       time_horizon_years: timeHorizon,
     });
+
+    // Simulation runs as a background job; poll until it finishes
+    const job = await jobsAPI.waitFor(response.data.id);
+    if (job.status === 'failed') {
+      throw { response: { data: { detail: job.error || 'Simulation failed' } } };
+    }
+    return decisionsAPI.getById(id);
+  },
+};
+
+// Jobs API
+export const jobsAPI = {
+  get: async (id: string) => {
+    const response = await api.get(`/api/v1/jobs/${id}`);
     return response.data;
   },
+
+  waitFor: async (id: string, intervalMs: number = 1000, timeoutMs: number = 180000) => {
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+      const job = await jobsAPI.get(id);
+      if (job.status === 'completed' || job.status === 'failed') {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+    throw { response: { data: { detail: 'Simulation timed out' } } };
+  },
 };
 
 export default api;